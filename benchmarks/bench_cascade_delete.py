@@ -0,0 +1,52 @@
+"""
+Times deleting a user that owns a large number of bucketlist items.
+
+Uses the testing configuration, whose database is reset. Run from the
+project root with:
+    APP_SETTINGS=testing python -m benchmarks.bench_cascade_delete [items]
+"""
+import sys
+import time
+
+from bucketlist.app import create_app
+from bucketlist.extensions import db
+from bucketlist.models.models import Bucketlist, Bucketlistitem, User
+
+
+def main(total_items=100000, items_per_bucketlist=100):
+    app = create_app('testing')
+    with app.app_context():
+        db.session.close()
+        db.drop_all()
+        db.create_all()
+
+        user = User('bench', 'bench@example.com', 'Password12')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        bucketlist_count = max(total_items // items_per_bucketlist, 1)
+        db.session.execute(Bucketlist.__table__.insert(), [
+            {'name': 'bucketlist %d' % index, 'created_by': user_id}
+            for index in range(bucketlist_count)])
+        bucketlist_ids = [bucketlist_id for bucketlist_id, in db.session.query(
+            Bucketlist.id).filter(Bucketlist.created_by == user_id)]
+        db.session.execute(Bucketlistitem.__table__.insert(), [
+            {'name': 'item %d' % index, 'done': False,
+             'bucketlist_id': bucketlist_ids[index % bucketlist_count]}
+            for index in range(total_items)])
+        db.session.commit()
+        db.session.expunge_all()
+
+        started = time.time()
+        User.delete_user(user_id)
+        elapsed = time.time() - started
+
+        remaining = Bucketlistitem.query.count()
+        print('deleted a user with %d bucketlists and %d items in %.3fs '
+              '(%d items left)' % (bucketlist_count, total_items, elapsed,
+                                   remaining))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
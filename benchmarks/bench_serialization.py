@@ -0,0 +1,53 @@
+"""
+Microbenchmark of the serialization cost of one 100-bucketlist page.
+
+Run from the project root with:
+    python -m benchmarks.bench_serialization [items_per_bucketlist]
+"""
+import datetime
+import sys
+import timeit
+from collections import namedtuple
+
+from bucketlist import serializers
+
+Bucket = namedtuple(
+    'Bucket',
+    'id name created_by date_created date_modified item_count done_count')
+Item = namedtuple('Item', 'id name done date_created date_modified')
+
+
+def build_page(items_per_bucketlist):
+    now = datetime.datetime(2017, 7, 1, 12, 30, 15)
+    page = []
+    for bucket_id in range(1, 101):
+        bucket = Bucket(bucket_id, 'bucketlist %d' % bucket_id, 1, now, now,
+                        items_per_bucketlist, (items_per_bucketlist + 1) // 2)
+        items = [Item(bucket_id * 1000 + item_id, 'item %d' % item_id,
+                      item_id % 2 == 0, now, now)
+                 for item_id in range(items_per_bucketlist)]
+        page.append((bucket, items))
+    return page
+
+
+def serialize_page(page):
+    return serializers.dumps({
+        'bucketlists': [serializers.serialize_bucketlist(bucket, items)
+                        for bucket, items in page]
+    })
+
+
+def main(items_per_bucketlist=5, number=200):
+    page = build_page(items_per_bucketlist)
+    print('100 bucketlists x %d items, best of 5 x %d runs' % (
+        items_per_bucketlist, number))
+    for name in sorted(serializers.backends):
+        serializers.set_backend(name)
+        best = min(timeit.repeat(
+            lambda: serialize_page(page), number=number, repeat=5))
+        print('%-8s %8.1f us/page  %d bytes' % (
+            name, best / number * 1e6, len(serialize_page(page))))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
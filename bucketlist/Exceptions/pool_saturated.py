@@ -0,0 +1,13 @@
+class PoolSaturated(Exception):
+    status_code = 503
+
+    def __init__(self, message, retry_after, payload=None):
+        Exception.__init__(self)
+        self.message = message
+        self.retry_after = retry_after
+        self.payload = payload
+
+    def to_dict(self):
+        rv = dict(self.payload or ())
+        rv['message'] = self.message
+        return rv
@@ -4,7 +4,10 @@ from flask import Flask
 from flask_cors import CORS, cross_origin
 
 from bucketlist.config import app_config
-from bucketlist.extensions import bcrypt, db, migrate
+from bucketlist.extensions import (
+    bcrypt, db, event_broker, metrics, migrate, password_hasher,
+    replica_router, response_cache, token_cache)
+from bucketlist.models.models import subscribe
 from .v1.views import v1
 
 config_name = os.getenv('APP_SETTINGS')
@@ -23,10 +26,19 @@ def create_app(config_object):
 def register_extensions(app):
     """Register Flask extensions."""
     bcrypt.init_app(app)
+    password_hasher.init_app(app)
+    token_cache.init_app(app)
+    response_cache.init_app(app)
+    subscribe(response_cache.on_change)
+    event_broker.init_app(app)
+    subscribe(event_broker.on_change)
     db.init_app(app)
-    with app.app_context():
-        db.create_all()
+    replica_router.init_app(app)
     migrate.init_app(app, db)
+    metrics.register('token_cache', token_cache.stats)
+    metrics.register('database_pools', db.pool_stats)
+    metrics.register('response_cache', response_cache.stats)
+    metrics.register('events', event_broker.stats)
     return None
 
 
@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCacheBackend(object):
+    """
+    In-process cache holding at most max_size entries, least recently
+    used first out
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get_many(self, keys):
+        now = time.time()
+        with self._lock:
+            return [self._get(key, now) for key in keys]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def add(self, key, value, ttl):
+        with self._lock:
+            if self._get(key, time.time()) is not None:
+                return False
+        self.set(key, value, ttl)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisCacheBackend(object):
+    """
+    Cache shared by all workers, kept in Redis or anything speaking its
+    protocol. client needs mget, set (with ex and nx) and flushdb.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, prefix='bucketlist:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        return self.client.mget([self.prefix + key for key in keys])
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def add(self, key, value, ttl):
+        return bool(self.client.set(self.prefix + key, value, ex=ttl, nx=True))
+
+    def clear(self):
+        self.client.flushdb()
+
+    def size(self):
+        return None
+
+
+class ResponseCache(object):
+    """
+    Per-user cache of serialized GET responses.
+
+    Keys carry version tokens for the user, for the user's bucketlist list
+    and for the single bucketlist they show. A write replaces the tokens it
+    affects, which leaves the stale entries unreachable until they expire;
+    a token that is evicted or expires is simply replaced, so it can only
+    cause misses, never stale hits. A backend that fails behaves like an
+    empty cache: lookups miss and writes are skipped. Keys also carry the freshness token of
+    the rows behind the response, so a body is only served for the state
+    its ETag describes, even when the write happened on another worker or
+    its invalidation has not run yet.
+    """
+
+    def __init__(self, backend=None, ttl=60):
+        self.backend = backend or LRUCacheBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CACHE_TTL', self.ttl)
+        name = app.config.get('CACHE_BACKEND', 'memory')
+        if name == 'redis':
+            if redis is None:
+                raise RuntimeError('CACHE_BACKEND redis needs the redis package')
+            self.backend = RedisCacheBackend(
+                redis.StrictRedis.from_url(app.config.get('CACHE_REDIS_URL')))
+        else:
+            self.backend = LRUCacheBackend(app.config.get('CACHE_MAX_SIZE', 1024))
+        self.clear()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def _tokens(self, keys):
+        try:
+            tokens = self.backend.get_many(keys)
+        except Exception:
+            logger.exception('response cache backend failed')
+            # Random tokens make a key no later request uses, so this one
+            # simply misses
+            return [uuid.uuid4().hex for _ in keys]
+        for index, token in enumerate(tokens):
+            if token is None:
+                token = uuid.uuid4().hex
+                try:
+                    if not self.backend.add(keys[index], token, self.ttl):
+                        token = self.backend.get_many(
+                            [keys[index]])[0] or token
+                except Exception:
+                    logger.exception('response cache backend failed')
+            elif isinstance(token, bytes):
+                token = token.decode('ascii')
+            tokens[index] = token
+        return tokens
+
+    def list_key(self, user_id, freshness):
+        """
+        Key of the current request's response to a listing of the bucketlists
+        of user_id, in the database state described by the freshness token
+        """
+        tokens = self._tokens(['user:%d' % user_id, 'list:%d' % user_id])
+        return 'bucketlists:%d:%s:%s:%s' % (
+            user_id, ':'.join(tokens), freshness, request.url)
+
+    def detail_key(self, user_id, bucketlist_id, freshness):
+        """
+        Key of the current request's response to a single bucketlist, in the
+        database state described by the freshness token
+        """
+        tokens = self._tokens(
+            ['user:%d' % user_id, 'bucketlist:%d' % bucketlist_id])
+        return 'bucketlist:%d:%s:%s:%s' % (
+            user_id, ':'.join(tokens), freshness, request.url)
+
+    def get(self, key):
+        try:
+            body = self.backend.get_many([key])[0]
+        except Exception:
+            logger.exception('response cache backend failed')
+            body = None
+        with self._lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return body
+
+    def set(self, key, body):
+        try:
+            self.backend.set(key, body, self.ttl)
+        except Exception:
+            logger.exception('response cache backend failed')
+
+    def invalidate(self, user_id, bucketlist_ids=None):
+        """
+        Drops the cached listings of user_id and the cached bucketlists
+        with the given ids, or all of the user's entries without ids
+        """
+        if not self.enabled:
+            return
+        keys = ['list:%d' % user_id]
+        if bucketlist_ids is None:
+            keys.append('user:%d' % user_id)
+        else:
+            keys.extend('bucketlist:%d' % bucketlist_id
+                        for bucketlist_id in bucketlist_ids)
+        try:
+            for key in keys:
+                self.backend.set(key, uuid.uuid4().hex, self.ttl)
+        except Exception:
+            # Entries stay reachable until they expire, but bodies are
+            # keyed on the freshness of their rows and are never stale
+            logger.exception('response cache backend failed')
+
+    def on_change(self, change):
+        self.invalidate(change.user_id, change.bucketlist_ids)
+
+    def clear(self):
+        try:
+            self.backend.clear()
+        except Exception:
+            logger.exception('response cache backend failed')
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / lookups if lookups else 0.0,
+                'size': self.backend.size()
+            }
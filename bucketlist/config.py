@@ -7,6 +7,42 @@ class Config(object):
     SECRET = os.getenv('SECRET')
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    REFRESH_TOKEN_LIFETIME = int(os.getenv('REFRESH_TOKEN_LIFETIME', 2592000))
+    BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', 5000))
+    ITEMS_EMBED_LIMIT = int(os.getenv('ITEMS_EMBED_LIMIT', 20))
+    TOKEN_CACHE_MAX_SIZE = int(os.getenv('TOKEN_CACHE_MAX_SIZE', 1024))
+    BCRYPT_POOL_WORKERS = int(os.getenv('BCRYPT_POOL_WORKERS', 2))
+    BCRYPT_POOL_MAX_PENDING = int(os.getenv('BCRYPT_POOL_MAX_PENDING', 16))
+    BCRYPT_POOL_RETRY_AFTER = int(os.getenv('BCRYPT_POOL_RETRY_AFTER', 1))
+    SQLALCHEMY_POOL_SIZE = int(os.getenv('SQLALCHEMY_POOL_SIZE', 5))
+    SQLALCHEMY_MAX_OVERFLOW = int(os.getenv('SQLALCHEMY_MAX_OVERFLOW', 10))
+    SQLALCHEMY_POOL_TIMEOUT = int(os.getenv('SQLALCHEMY_POOL_TIMEOUT', 30))
+    SQLALCHEMY_POOL_RECYCLE = int(os.getenv('SQLALCHEMY_POOL_RECYCLE', 1800))
+    SQLALCHEMY_POOL_PRE_PING = os.getenv(
+        'SQLALCHEMY_POOL_PRE_PING', 'true').lower() == 'true'
+    DATABASE_STATEMENT_TIMEOUT = int(
+        os.getenv('DATABASE_STATEMENT_TIMEOUT', 30000))
+    # Reads of authenticated GET requests go to the replica when one is set.
+    SQLALCHEMY_BINDS = {
+        'replica': os.getenv('SQLALCHEMY_REPLICA_URL')
+    } if os.getenv('SQLALCHEMY_REPLICA_URL') else None
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+    # Cached GET responses, CACHE_BACKEND is memory or redis.
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+    CACHE_TTL = int(os.getenv('CACHE_TTL', 60))
+    CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', 1024))
+    # Change streams, EVENTS_BACKEND is memory or redis to share events
+    # between workers.
+    EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'memory')
+    EVENTS_REDIS_URL = os.getenv('EVENTS_REDIS_URL')
+    EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+    EVENTS_HEARTBEAT_SECONDS = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+    # Incremental sync resends rows this close to the previous sync and
+    # keeps tombstones of deleted rows for this many days.
+    SYNC_OVERLAP_SECONDS = int(os.getenv('SYNC_OVERLAP_SECONDS', 5))
+    SYNC_TOMBSTONE_RETENTION_DAYS = int(
+        os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
 
 
 class ProductionConfig(Config):
@@ -21,6 +57,7 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:////tmp/test.db'
+    BCRYPT_POOL_WORKERS = 0
     PRESERVE_CONTEXT_ON_EXCEPTION = False
     TESTING = True
 
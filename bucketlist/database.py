@@ -0,0 +1,225 @@
+import math
+import threading
+import time
+
+import flask_sqlalchemy
+from flask import after_this_request, current_app, request
+from itsdangerous import BadSignature, Signer
+from sqlalchemy import event, exc, orm
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.expression import Select
+
+# Engine options that only make sense for a pool that keeps connections.
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+# Carries a user's read-your-writes deadline to whichever worker serves
+# their next request.
+STICKY_COOKIE = 'replica_sticky'
+
+
+def ping_connection(dbapi_connection, connection_record, connection_proxy):
+    """
+    Checks a pooled connection before handing it out. A connection the
+    server has dropped is discarded and the pool retries with a new one.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    except Exception:
+        raise exc.DisconnectionError()
+    finally:
+        cursor.close()
+
+
+class PoolStats(object):
+    """
+    Counts the connection events of one engine's pool
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        pool = engine.pool
+        event.listen(pool, 'connect', self._count('connects'))
+        event.listen(pool, 'checkout', self._count('checkouts'))
+        event.listen(pool, 'invalidate', self._count('invalidations'))
+
+    def _count(self, name):
+        def listener(*args):
+            with self._lock:
+                setattr(self, name, getattr(self, name) + 1)
+        return listener
+
+    def stats(self):
+        pool = self.engine.pool
+        with self._lock:
+            result = {
+                'pool': type(pool).__name__,
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'invalidations': self.invalidations
+            }
+        if hasattr(pool, 'checkedout'):
+            result.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow())
+        return result
+
+
+class RoutingSession(flask_sqlalchemy.SignallingSession):
+    """
+    Session that sends SELECT statements to the replica bind once
+    info['replica'] is set. Flushes and every other statement stay on the
+    primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if (self.info.get('replica') and not self._flushing and
+                (clause is None or isinstance(clause, Select))):
+            db = flask_sqlalchemy.get_state(self.app).db
+            return db.get_engine(self.app, bind='replica')
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+class SQLAlchemy(flask_sqlalchemy.SQLAlchemy):
+    """
+    Flask-SQLAlchemy with pool and timeout settings taken from the app
+    config: the SQLALCHEMY_POOL_* options, SQLALCHEMY_POOL_PRE_PING and
+    DATABASE_STATEMENT_TIMEOUT in milliseconds. Pool sizing is left out
+    for SQLite, whose file databases are opened without a queue.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(SQLAlchemy, self).__init__(*args, **kwargs)
+        self._pool_stats = {}
+        self._pool_lock = threading.Lock()
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, info, options):
+        timeout = app.config.get('DATABASE_STATEMENT_TIMEOUT')
+        connect_args = options.setdefault('connect_args', {})
+        if info.drivername.startswith('sqlite'):
+            for option in QUEUE_POOL_OPTIONS:
+                options.pop(option, None)
+            if timeout:
+                # How long a statement waits on a locked database.
+                connect_args['timeout'] = timeout / 1000.0
+        elif info.drivername.startswith('postgresql') and timeout:
+            connect_args['options'] = '-c statement_timeout=%d' % timeout
+        super(SQLAlchemy, self).apply_driver_hacks(app, info, options)
+
+    def get_engine(self, app=None, bind=None):
+        engine = super(SQLAlchemy, self).get_engine(app, bind)
+        stats = self._pool_stats.get(bind)
+        if stats is None or stats.engine is not engine:
+            self._instrument(self.get_app(app), engine, bind)
+        return engine
+
+    def _instrument(self, app, engine, bind):
+        with self._pool_lock:
+            stats = self._pool_stats.get(bind)
+            if stats is not None and stats.engine is engine:
+                return
+            if (app.config.get('SQLALCHEMY_POOL_PRE_PING') and
+                    not isinstance(engine.pool, NullPool)):
+                event.listen(engine.pool, 'checkout', ping_connection)
+            self._pool_stats[bind] = PoolStats(engine)
+
+    def pool_stats(self):
+        """
+        Returns the pool statistics of every engine created so far, keyed
+        by bind name
+        """
+        return dict((bind or 'default', stats.stats())
+                    for bind, stats in list(self._pool_stats.items()))
+
+
+class ReplicaRouter(object):
+    """
+    Decides per request whether reads may go to the replica bind.
+
+    Users who wrote within the last window seconds keep reading from the
+    primary so that they see their own changes despite replication lag.
+    The deadline is kept by the worker that took the write and handed to
+    the client in a signed cookie, so every other worker honours it too.
+    """
+
+    def __init__(self, db, window=5):
+        self.db = db
+        self.window = window
+        self._writes = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.window = app.config.get('REPLICA_STICKY_SECONDS', self.window)
+        self.clear()
+
+    @staticmethod
+    def enabled():
+        return 'replica' in (current_app.config.get('SQLALCHEMY_BINDS') or {})
+
+    def route_reads(self, user_id):
+        """
+        Lets the current session read from the replica unless user_id
+        wrote recently
+        """
+        if self.enabled() and not self.is_sticky(user_id):
+            self.db.session().info['replica'] = True
+
+    @staticmethod
+    def _signer():
+        return Signer(current_app.config['SECRET'], salt=STICKY_COOKIE)
+
+    def record_write(self, user_id):
+        now = time.time()
+        until = now + self.window
+        with self._lock:
+            self._writes[user_id] = until
+            if len(self._writes) > 1024:
+                self._writes = dict(
+                    (key, until) for key, until in self._writes.items()
+                    if until > now)
+        if self.enabled():
+            value = self._signer().sign(
+                ('%d:%d' % (user_id, math.ceil(until))).encode('ascii'))
+
+            @after_this_request
+            def set_cookie(response):
+                response.set_cookie(
+                    STICKY_COOKIE, value.decode('ascii'),
+                    max_age=self.window, httponly=True)
+                return response
+
+    def sticky_until(self, user_id):
+        """
+        Deadline carried by the current request's cookie for user_id, or 0
+        """
+        cookie = request.cookies.get(STICKY_COOKIE)
+        if not cookie:
+            return 0
+        try:
+            value = self._signer().unsign(cookie.encode('ascii'))
+            cookie_user, until = value.decode('ascii').split(':')
+            if int(cookie_user) == user_id:
+                return int(until)
+        except (BadSignature, ValueError, UnicodeError):
+            pass
+        return 0
+
+    def is_sticky(self, user_id):
+        with self._lock:
+            until = self._writes.get(user_id)
+        if until is None or until <= time.time():
+            until = self.sticky_until(user_id)
+        return until > time.time()
+
+    def clear(self):
+        with self._lock:
+            self._writes.clear()
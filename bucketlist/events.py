@@ -0,0 +1,282 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription(object):
+    """
+    Bounded queue of the events for one stream. A subscriber that falls
+    more than max_size events behind is marked overflowed and stops
+    receiving, its client has to resync instead.
+    """
+
+    def __init__(self, user_id, max_size=100):
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(max_size)
+
+    def put(self, event):
+        if self.overflowed:
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+            return False
+        return True
+
+    def get(self, timeout):
+        """
+        Waits up to timeout seconds for the next event, None if none came
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """
+        Ends the stream with a resync, waking it up if it is waiting
+        """
+        self.overflowed = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+class LocalEventBackend(object):
+    """
+    Delivers events to the streams of this process only
+    """
+
+    name = 'memory'
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, message):
+        self.deliver(message)
+
+    def close(self):
+        pass
+
+
+class RedisEventBackend(object):
+    """
+    Shares events between all workers through a Redis pub/sub channel.
+    Every process listens on the channel in a daemon thread and delivers
+    what it receives, its own events included, to its local streams.
+
+    When the connection drops the listener calls lost, since events may
+    have been missed, and reconnects with exponential backoff from
+    backoff up to max_backoff seconds.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, deliver, channel='bucketlist:events',
+                 lost=None, backoff=0.5, max_backoff=30):
+        self.client = client
+        self.deliver = deliver
+        self.channel = channel
+        self.lost = lost
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.reconnects = 0
+        self._closed = False
+        self._pubsub = self._subscribe()
+        self._thread = threading.Thread(target=self._listen)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _subscribe(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+    def _listen(self):
+        delay = self.backoff
+        while not self._closed:
+            try:
+                if self._pubsub is None:
+                    self._pubsub = self._subscribe()
+                    self.reconnects += 1
+                for message in self._pubsub.listen():
+                    delay = self.backoff
+                    if message and message.get('type') == 'message':
+                        data = message['data']
+                        if isinstance(data, bytes):
+                            data = data.decode('utf-8')
+                        self.deliver(json.loads(data))
+                if self._closed:
+                    return
+                raise ConnectionError('subscription ended')
+            except Exception:
+                if self._closed:
+                    return
+                logger.exception(
+                    'event relay lost Redis, reconnecting in %.1fs', delay)
+                self._pubsub = None
+                if self.lost is not None:
+                    self.lost()
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    def publish(self, message):
+        self.client.publish(self.channel, json.dumps(message))
+
+    def close(self):
+        self._closed = True
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+def format_event(event):
+    """
+    Encodes an event as a Server-Sent Events message
+    """
+    data = dict((key, value) for key, value in event.items() if key != 'id')
+    return ('id: %d\nevent: change\ndata: %s\n\n' % (
+        event['id'], json.dumps(data, separators=(',', ':')))).encode('utf-8')
+
+
+def stream_events(broker, user_id, retry=5000):
+    """
+    Yields the events of user_id as Server-Sent Events, with a comment
+    line whenever nothing happened for a heartbeat interval. Once its
+    queue overflowed the client is told to resync and the stream ends.
+    The subscription only lives while the stream is being read.
+    """
+    subscription = broker.subscribe(user_id)
+    try:
+        yield ('retry: %d\n\n' % retry).encode('ascii')
+        while True:
+            event = subscription.get(broker.heartbeat)
+            if subscription.overflowed:
+                break
+            if event is not None:
+                yield format_event(event)
+            else:
+                yield b': heartbeat\n\n'
+        yield b'event: resync\ndata: {}\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+class EventBroker(object):
+    """
+    Fans the changes committed by the models out to the event streams of
+    their users.
+
+    Publishing never blocks: each stream has a bounded queue, and a stream
+    that cannot keep up is dropped rather than slowing down writers or
+    buffering without limit.
+    """
+
+    def __init__(self, queue_size=100, heartbeat=15):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.backend = LocalEventBackend(self.deliver)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._subscriptions = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.queue_size = app.config.get('EVENTS_QUEUE_SIZE', self.queue_size)
+        self.heartbeat = app.config.get('EVENTS_HEARTBEAT_SECONDS', self.heartbeat)
+        self.backend.close()
+        name = app.config.get('EVENTS_BACKEND', 'memory')
+        if name == 'redis':
+            if redis is None:
+                raise RuntimeError('EVENTS_BACKEND redis needs the redis package')
+            self.backend = RedisEventBackend(
+                redis.StrictRedis.from_url(app.config.get('EVENTS_REDIS_URL')),
+                self.deliver, lost=self.resync)
+        else:
+            self.backend = LocalEventBackend(self.deliver)
+        with self._lock:
+            self.published = 0
+            self.delivered = 0
+            self.dropped = 0
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def resync(self):
+        """
+        Ends every local stream with a resync, after events may have been
+        lost
+        """
+        with self._lock:
+            subscriptions = [subscription for subscriptions in
+                             self._subscriptions.values()
+                             for subscription in subscriptions]
+        for subscription in subscriptions:
+            subscription.close()
+
+    def on_change(self, change):
+        """
+        Publishes a models Change through the backend
+        """
+        with self._lock:
+            self.published += 1
+        self.backend.publish({
+            'user_id': change.user_id,
+            'kind': change.kind,
+            'action': change.action,
+            'ids': change.ids,
+            'bucketlist_ids': change.bucketlist_ids
+        })
+
+    def deliver(self, message):
+        """
+        Hands a published message to the local streams of its user
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(message['user_id'], ()))
+            event_id = next(self._ids)
+        event = dict(message, id=event_id)
+        event.pop('user_id', None)
+        for subscription in subscriptions:
+            delivered = subscription.put(event)
+            with self._lock:
+                if delivered:
+                    self.delivered += 1
+                else:
+                    self.dropped += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.backend.name,
+                'reconnects': getattr(self.backend, 'reconnects', 0),
+                'streams': sum(len(subscriptions) for subscriptions in
+                               self._subscriptions.values()),
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped
+            }
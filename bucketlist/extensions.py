@@ -1,7 +1,32 @@
+import sqlite3
+
 from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from bucketlist.cache import ResponseCache
+from bucketlist.database import ReplicaRouter, SQLAlchemy
+from bucketlist.events import EventBroker
+from bucketlist.hashing import PasswordHasher
+from bucketlist.metrics import MetricsRegistry
+from bucketlist.token_cache import TokenCache
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
 migrate = Migrate()
+token_cache = TokenCache()
+password_hasher = PasswordHasher()
+metrics = MetricsRegistry()
+replica_router = ReplicaRouter(db)
+response_cache = ResponseCache()
+event_broker = EventBroker()
+
+
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite only enforces foreign keys, and ON DELETE CASCADE, when asked to"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
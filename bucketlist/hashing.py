@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+from bucketlist.Exceptions.pool_saturated import PoolSaturated
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return value
+
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(
+        _to_bytes(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check_password(pw_hash, password):
+    return bcrypt.checkpw(_to_bytes(password), _to_bytes(pw_hash))
+
+
+class PasswordHasher(object):
+    """
+    Runs bcrypt hashing and verification on a bounded process pool so that
+    login bursts do not pin the request workers.
+
+    At most workers + max_pending jobs are admitted at a time, anything
+    beyond that fails fast with PoolSaturated. With workers set to 0 the
+    work runs on the request thread but the admission limit still holds.
+    """
+
+    def __init__(self):
+        self.rounds = 12
+        self.retry_after = 1
+        self._executor = None
+        self._workers = 0
+        self._slots = threading.BoundedSemaphore(1)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.configure(
+            workers=app.config.get('BCRYPT_POOL_WORKERS', 0),
+            max_pending=app.config.get('BCRYPT_POOL_MAX_PENDING', 16),
+            retry_after=app.config.get('BCRYPT_POOL_RETRY_AFTER', 1),
+            rounds=app.config.get('BCRYPT_LOG_ROUNDS', 12))
+
+    def configure(self, workers, max_pending, retry_after=1, rounds=12):
+        self.shutdown()
+        self.rounds = rounds
+        self.retry_after = retry_after
+        self._workers = workers
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + max_pending)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _get_executor(self):
+        # The pool is started lazily so that it is created in the serving
+        # process rather than in a parent that forks workers later.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self._workers)
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(False):
+            raise PoolSaturated(
+                "Server busy, please try again later", self.retry_after)
+        try:
+            if not self._workers:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash_password(self, password):
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        return self._run(_hash_password, password, self.rounds)
+
+    def check_password(self, pw_hash, password):
+        if not password:
+            return False
+        return self._run(_check_password, pw_hash, password)
@@ -0,0 +1,24 @@
+import threading
+
+
+class MetricsRegistry(object):
+    """
+    Collects runtime statistics from the parts of the app that keep them.
+
+    Each collector is a callable returning a dict; they are only called
+    when the metrics are read, so registering one costs nothing on the
+    request path.
+    """
+
+    def __init__(self):
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, collector):
+        with self._lock:
+            self._collectors[name] = collector
+
+    def collect(self):
+        with self._lock:
+            collectors = sorted(self._collectors.items())
+        return dict((name, collector()) for name, collector in collectors)
@@ -1,12 +1,134 @@
 import datetime
 
+import logging
 import os
+import uuid
+from collections import namedtuple
 
 import jwt
+from flask import current_app
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import relationship
 
 from bucketlist.Exceptions.invalid_query import InvalidQuery
-from bucketlist.extensions import db, bcrypt
+from bucketlist.extensions import db, password_hasher, token_cache
+
+ExportItem = namedtuple(
+    'ExportItem', 'id name done bucketlist_id date_created date_modified')
+
+# A committed change to the data of a user. kind is 'user', 'bucketlist' or
+# 'item' and action 'created', 'updated' or 'deleted'. ids are the changed
+# rows of that kind and bucketlist_ids the bucketlists they belong to;
+# either is None when the statement did not name its rows.
+Change = namedtuple('Change', 'user_id kind action ids bucketlist_ids')
+
+# Summary of the rows behind a response, see Bucketlist.freshness.
+Freshness = namedtuple('Freshness', 'last_modified token')
+
+change_listeners = []
+
+logger = logging.getLogger(__name__)
+
+# Keeps IN lists below the bound parameter limits of every backend.
+IN_CHUNK_SIZE = 500
+
+
+def chunked(values, size=IN_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def subscribe(listener):
+    """
+    Registers listener to be called with every Change after its commit
+    """
+    if listener not in change_listeners:
+        change_listeners.append(listener)
+
+
+def publish_change(user_id, kind, action, ids=None, bucketlist_ids=None):
+    change = Change(
+        user_id, kind, action,
+        None if ids is None else list(ids),
+        None if bucketlist_ids is None else list(bucketlist_ids))
+    # The change is already committed, a failing listener must not turn
+    # the request into an error
+    for listener in change_listeners:
+        try:
+            listener(change)
+        except Exception:
+            logger.exception('change listener %r failed', listener)
+
+
+def insert_ignoring_conflicts(table):
+    """
+    INSERT statement for table that skips rows violating a unique
+    constraint instead of failing the whole statement
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return table.insert().prefix_with('OR IGNORE')
+    if dialect == 'mysql':
+        return table.insert().prefix_with('IGNORE')
+    return table.insert()
+
+
+def update_returning(table, condition, values, columns, key=None):
+    """
+    Runs one UPDATE of table restricted by condition and returns the
+    updated row as columns, or None when no row matched. Databases with
+    RETURNING answer in the same statement, elsewhere the row is read
+    back inside the same transaction, by key when condition no longer
+    matches it after the update.
+    """
+    statement = table.update().where(condition).values(values)
+    if db.engine.dialect.name == 'postgresql':
+        return db.session.execute(statement.returning(*columns)).first()
+    if not db.session.execute(statement).rowcount:
+        return None
+    return db.session.execute(db.select(list(columns)).where(
+        condition if key is None else key)).first()
+
+
+def delete_counting(table, condition, flag):
+    """
+    Runs one DELETE of table restricted by condition and returns the
+    number of rows removed and how many of them had flag set. Databases
+    with RETURNING report the deleted rows themselves, elsewhere the rows
+    are counted just before the DELETE, in the same transaction.
+    """
+    statement = table.delete().where(condition)
+    if db.engine.dialect.name == 'postgresql':
+        flags = [row[0] for row in
+                 db.session.execute(statement.returning(flag))]
+        return len(flags), sum(1 for value in flags if value)
+    count, flagged = db.session.execute(db.select([
+        db.func.count(),
+        db.func.sum(db.case([(flag == db.true(), 1)], else_=0))]).select_from(
+        table).where(condition)).first()
+    if count:
+        db.session.execute(statement)
+    return count, flagged or 0
+
+
+def insert_returning(table, select, names, columns):
+    """
+    Runs one INSERT ... SELECT into table and returns the new row as
+    columns, or None when select produced no row
+    """
+    statement = table.insert().from_select(names, select)
+    if db.engine.dialect.name == 'postgresql':
+        return db.session.execute(statement.returning(*columns)).first()
+    result = db.session.execute(statement)
+    if not result.rowcount:
+        return None
+    primary_key = list(table.primary_key)[0]
+    return db.session.execute(db.select(list(columns)).where(
+        primary_key == result.lastrowid)).first()
 
 
 class User(db.Model):
@@ -16,12 +138,20 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(255), unique=True, nullable=False)
+    password = db.Column(db.String(255), nullable=False)
 
     bucketlists = relationship(
         "Bucketlist",
         backref="users",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy='dynamic')
+
+    refresh_tokens = relationship(
+        "RefreshToken",
+        backref="users",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
         lazy='dynamic')
 
     def __init__(self, username, email, password):
@@ -30,31 +160,30 @@ class User(db.Model):
         self.hash_password(password)
 
     def hash_password(self, password):
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = password_hasher.hash_password(password)
         return self.password
 
     def check_password(self, passw):
-        return bcrypt.check_password_hash(self.password.encode('utf-8'), passw)
+        return password_hasher.check_password(self.password, passw)
 
     def __repr__(self):
         return '<User %r>' % self.username
 
     @staticmethod
     def create_user(username, email, password):
-        # Add a new user to the users table
-        try:
-            user = User.query.filter_by(username=username).first()
-            if user:
-                return "user already exists", 202
-            user = User.query.filter_by(email=email).first()
-            if user:
-                return "email already exists", 202
-        except InvalidQuery:
-            return "Query error!"
-
+        # Add a new user to the users table, the unique constraints on
+        # username and email reject duplicates
         user = User(username, email, password)
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            taken = db.session.query(User.username).filter(db.or_(
+                User.username == username, User.email == email)).first()
+            if taken is None or taken.username == username:
+                return "user already exists", 202
+            return "email already exists", 202
         return user
 
     @staticmethod
@@ -89,6 +218,7 @@ class User(db.Model):
         if user:
             db.session.delete(user)
             db.session.commit()
+            publish_change(user_id, 'user', 'deleted', [user_id])
         return "user deleted", 200
 
     @staticmethod
@@ -114,11 +244,18 @@ class User(db.Model):
     @staticmethod
     def decode_auth_token(auth_token):
         """
-        Decodes the auth token
+        Decodes the auth token. Tokens that already passed verification
+        are answered from the token cache until they expire.
 
         """
+        user_id = token_cache.get(auth_token)
+        if user_id is not None:
+            return user_id
         try:
             payload = jwt.decode(auth_token, os.getenv('SECRET'))
+            if payload.get('type') == 'refresh':
+                return 'Invalid token. Please log in again.'
+            token_cache.set(auth_token, payload['sub'], payload['exp'])
             return payload['sub']
         except jwt.ExpiredSignatureError:
             return 'Signature expired. Please log in again.'
@@ -126,21 +263,129 @@ class User(db.Model):
             return 'Invalid token. Please log in again.'
 
 
+class RefreshToken(db.Model):
+    # Issued refresh tokens, kept so that they can be revoked
+    __tablename__ = "refresh_tokens"
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(32), unique=True, nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False)
+    revoked = db.Column(db.Boolean, default=False, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    date_created = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __init__(self, jti, user_id, expires_at):
+        self.jti = jti
+        self.user_id = user_id
+        self.expires_at = expires_at
+
+    def __repr__(self):
+        return '<RefreshToken %r>' % self.jti
+
+    @staticmethod
+    def encode_refresh_token(user_id):
+        """
+        Generates a long lived refresh token and records it so that it
+        can be revoked later
+
+        """
+        lifetime = current_app.config.get('REFRESH_TOKEN_LIFETIME', 2592000)
+        now = datetime.datetime.utcnow()
+        expires_at = now + datetime.timedelta(seconds=lifetime)
+        refresh_token = RefreshToken(uuid.uuid4().hex, user_id, expires_at)
+        db.session.add(refresh_token)
+        db.session.commit()
+        payload = {
+            'exp': expires_at,
+            'iat': now,
+            'sub': user_id,
+            'jti': refresh_token.jti,
+            'type': 'refresh'
+        }
+        return jwt.encode(payload, os.getenv('SECRET'), algorithm='HS256')
+
+    @staticmethod
+    def decode_refresh_token(token):
+        """
+        Verifies a refresh token and returns its stored record, or an
+        error message when it is invalid, expired or revoked
+
+        """
+        try:
+            payload = jwt.decode(token, os.getenv('SECRET'))
+        except jwt.ExpiredSignatureError:
+            return 'Refresh token expired. Please log in again.'
+        except jwt.InvalidTokenError:
+            return 'Invalid refresh token. Please log in again.'
+        if payload.get('type') != 'refresh':
+            return 'Invalid refresh token. Please log in again.'
+        try:
+            refresh_token = RefreshToken.query.filter_by(
+                jti=payload.get('jti'), user_id=payload['sub']).first()
+        except InvalidQuery:
+            return 'Query error!'
+        if not refresh_token or refresh_token.revoked:
+            return 'Refresh token revoked. Please log in again.'
+        return refresh_token
+
+    @staticmethod
+    def refresh_access_token(token):
+        """
+        Mints a new access token from a refresh token. Only the HMAC of the
+        refresh token is checked, the password is not needed again.
+
+        """
+        refresh_token = RefreshToken.decode_refresh_token(token)
+        if not isinstance(refresh_token, RefreshToken):
+            return refresh_token
+        return User.encode_auth_token(refresh_token.user_id)
+
+    @staticmethod
+    def revoke_refresh_token(token):
+        refresh_token = RefreshToken.decode_refresh_token(token)
+        if not isinstance(refresh_token, RefreshToken):
+            return refresh_token, 401
+        refresh_token.revoked = True
+        db.session.add(refresh_token)
+        db.session.commit()
+        return "Refresh token revoked", 200
+
+
 class Bucketlist(db.Model):
     __tablename__ = 'bucketlists'
+    __table_args__ = (
+        db.Index('ix_bucketlists_created_by_name', 'created_by', 'name',
+                 unique=True),
+        db.Index('ix_bucketlists_created_by_id', 'created_by', 'id'),
+        db.Index('ix_bucketlists_created_by_date_modified',
+                 'created_by', 'date_modified'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50))
-    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_by = db.Column(
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
     date_created = db.Column(db.DateTime, default=db.func.current_timestamp())
     date_modified = db.Column(
         db.DateTime, default=db.func.current_timestamp(),
         onupdate=db.func.current_timestamp())
+    # Denormalized from the items, kept up to date by the item write paths
+    item_count = db.Column(
+        db.Integer, default=0, server_default='0', nullable=False)
+    done_count = db.Column(
+        db.Integer, default=0, server_default='0', nullable=False)
+    # Bumped by every write to the bucketlist or its items, date_modified
+    # only has a resolution of one second on some databases
+    version = db.Column(
+        db.Integer, default=0, server_default='0', nullable=False)
 
     bucketlists = relationship(
         "Bucketlistitem",
         backref="bucketlists",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         lazy='dynamic')
 
     def __init__(self, name, created_by):
@@ -151,58 +396,281 @@ class Bucketlist(db.Model):
     def get_all():
         return Bucketlist.query.all()
 
+    @staticmethod
+    def read_columns():
+        return (Bucketlist.id, Bucketlist.name, Bucketlist.created_by,
+                Bucketlist.date_created, Bucketlist.date_modified,
+                Bucketlist.item_count, Bucketlist.done_count)
+
+    @staticmethod
+    def read_query():
+        """
+        Selects only the columns the read endpoints serialize. Rows come
+        back as lightweight named tuples and never enter the session's
+        identity map.
+
+        """
+        return db.session.query(*Bucketlist.read_columns())
+
+    @staticmethod
+    def export(user_id, batch_size=500):
+        """
+        Streams every bucketlist of a user together with its items, as
+        (bucketlist, items) pairs in id order. Rows are read with a single
+        outer join through a server side cursor, so memory use does not
+        grow with the size of the account.
+
+        """
+        rows = db.session.query(
+            Bucketlist.id, Bucketlist.name, Bucketlist.created_by,
+            Bucketlist.date_created, Bucketlist.date_modified,
+            Bucketlist.item_count, Bucketlist.done_count,
+            Bucketlistitem.id.label('item_id'),
+            Bucketlistitem.name.label('item_name'),
+            Bucketlistitem.done.label('item_done'),
+            Bucketlistitem.date_created.label('item_date_created'),
+            Bucketlistitem.date_modified.label('item_date_modified')).outerjoin(
+            Bucketlistitem, Bucketlistitem.bucketlist_id == Bucketlist.id).filter(
+            Bucketlist.created_by == user_id).order_by(
+            Bucketlist.id, Bucketlistitem.id).yield_per(batch_size)
+
+        bucket = None
+        items = []
+        for row in rows:
+            if bucket is None or row.id != bucket.id:
+                if bucket is not None:
+                    yield bucket, items
+                bucket = row
+                items = []
+            if row.item_id is not None:
+                items.append(ExportItem(
+                    row.item_id, row.item_name, row.item_done, row.id,
+                    row.item_date_created, row.item_date_modified))
+        if bucket is not None:
+            yield bucket, items
+
     def __repr__(self):
         return '<Bucketlist %r>' % self.name
 
     @staticmethod
     def create_bucketlist(user_id, name):
-        try:
-            buckets = Bucketlist.query.filter_by(name=name).first()
-            if buckets:
-                return "Bucketlist name already taken!"
-        except InvalidQuery:
-            return "Query Error!"
+        # Names are unique per owner, enforced by a unique index
         bucketlist = Bucketlist(name, user_id)
         db.session.add(bucketlist)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return "Bucketlist name already taken!"
+        publish_change(
+            user_id, 'bucketlist', 'created', [bucketlist.id], [bucketlist.id])
         return bucketlist
 
+    @staticmethod
+    def freshness(user_id, bucketlist_id=None):
+        """
+        Probes the bucketlists of user_id, or just one of them, their items
+        and their tombstones with one aggregate query: row counts, newest
+        date_modified or deleted_at and highest id per table, plus the sum
+        of the bucketlist versions. Any insert, update or delete changes the
+        token, without loading a single row.
+
+        """
+        owned = [Bucketlist.created_by == user_id]
+        if bucketlist_id is not None:
+            owned.append(Bucketlist.id == bucketlist_id)
+        buckets = db.session.query(
+            db.func.count(Bucketlist.id),
+            db.func.max(Bucketlist.date_modified),
+            db.func.max(Bucketlist.id),
+            db.func.sum(Bucketlist.version)).filter(*owned)
+        items = db.session.query(
+            db.func.count(Bucketlistitem.id),
+            db.func.max(Bucketlistitem.date_modified),
+            db.func.max(Bucketlistitem.id),
+            db.literal(0)).filter(
+            Bucketlistitem.bucketlist_id.in_(
+                db.select([Bucketlist.id]).where(db.and_(*owned))))
+        deleted = [DeletedRecord.user_id == user_id]
+        if bucketlist_id is not None:
+            deleted.append(DeletedRecord.bucketlist_id == bucketlist_id)
+        tombstones = db.session.query(
+            db.func.count(DeletedRecord.id),
+            db.func.max(DeletedRecord.deleted_at),
+            db.func.max(DeletedRecord.id),
+            db.literal(0)).filter(*deleted)
+        rows = buckets.union_all(items, tombstones).all()
+        modified = [row[1] for row in rows if row[1] is not None]
+        return Freshness(
+            max(modified) if modified else None,
+            '|'.join('%s,%s,%s,%s' % tuple(row) for row in rows))
+
+    @staticmethod
+    def owned(bucketlist_id, user_id):
+        """
+        Subquery that yields the bucketlist id only when user_id owns it,
+        for scoping item statements to their owner
+
+        """
+        return db.select([Bucketlist.id]).where(db.and_(
+            Bucketlist.id == bucketlist_id, Bucketlist.created_by == user_id))
+
+    @staticmethod
+    def bulk_create_bucketlists(user_id, names):
+        """
+        Creates many bucketlists in a single transaction. Names the user
+        already has are found with one set based query and skipped, rows
+        that lose a race with a concurrent insert are dropped by the
+        unique index. Returns a dict mapping each created name to its
+        new id.
+
+        """
+        names = set(names)
+        taken = set()
+        for chunk in chunked(names):
+            taken.update(name for name, in db.session.query(
+                Bucketlist.name).filter(
+                Bucketlist.created_by == user_id, Bucketlist.name.in_(chunk)))
+        new_names = [name for name in names if name not in taken]
+        if new_names:
+            db.session.execute(
+                insert_ignoring_conflicts(Bucketlist.__table__),
+                [{'name': name, 'created_by': user_id} for name in new_names])
+        created = {}
+        for chunk in chunked(new_names):
+            created.update(db.session.query(
+                Bucketlist.name, Bucketlist.id).filter(
+                Bucketlist.created_by == user_id,
+                Bucketlist.name.in_(chunk)))
+        db.session.commit()
+        if created:
+            publish_change(user_id, 'bucketlist', 'created',
+                           created.values(), created.values())
+        return created
+
     @staticmethod
     def update_bucketlist(bucketlist_id, user_id, name=None):
-        try:
-            bucketlist = Bucketlist.query.filter_by(id=bucketlist_id).first()
-            if not bucketlist:
-                return "Bucketlist not found", 404
-        except InvalidQuery:
-            return "Query Error", 500
+        """
+        Renames a bucketlist of user_id with a single UPDATE and returns
+        the updated row, without loading it into the session first
+
+        """
+        condition = db.and_(
+            Bucketlist.id == bucketlist_id, Bucketlist.created_by == user_id)
         if name:
-            bucketlist.name = name
-        bucketlist.user_id = user_id
+            try:
+                bucketlist = update_returning(
+                    Bucketlist.__table__, condition,
+                    {'name': name, 'version': Bucketlist.version + 1},
+                    Bucketlist.read_columns())
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                return "Bucketlist name already taken!", 409
+            if bucketlist is not None:
+                publish_change(user_id, 'bucketlist', 'updated',
+                               [bucketlist_id], [bucketlist_id])
+        else:
+            bucketlist = Bucketlist.read_query().filter(condition).first()
+        if bucketlist is None:
+            return "Bucketlist not found", 404
+        return bucketlist
 
-        db.session.add(bucketlist)
+    @staticmethod
+    def count_items(bucketlist_id, items=0, done=0):
+        """
+        Adds items and done to the counters of a bucketlist and bumps its
+        version, in the current transaction. Item writes that leave the
+        counters alone call it with no deltas.
+
+        """
+        db.session.execute(Bucketlist.__table__.update().where(
+            Bucketlist.id == bucketlist_id).values(
+            item_count=Bucketlist.item_count + items,
+            done_count=Bucketlist.done_count + done,
+            version=Bucketlist.version + 1))
+
+    @staticmethod
+    def repair_counts():
+        """
+        Finds the bucketlists whose counters drifted from their items with
+        one GROUP BY over the items and rewrites only those. Returns the
+        number of bucketlists repaired.
+
+        """
+        items = Bucketlistitem.__table__
+        counts = db.select([
+            items.c.bucketlist_id,
+            db.func.count().label('items'),
+            db.func.sum(db.case([(items.c.done == db.true(), 1)],
+                                else_=0)).label('done')]).group_by(
+            items.c.bucketlist_id).alias('counts')
+        item_count = db.func.coalesce(counts.c['items'], 0)
+        done_count = db.func.coalesce(counts.c.done, 0)
+        drifted = db.session.query(
+            Bucketlist.id, item_count, done_count).outerjoin(
+            counts, counts.c.bucketlist_id == Bucketlist.id).filter(db.or_(
+                Bucketlist.item_count != item_count,
+                Bucketlist.done_count != done_count)).all()
+        if drifted:
+            db.session.execute(
+                Bucketlist.__table__.update().where(
+                    Bucketlist.id == db.bindparam('_id')).values(
+                    item_count=db.bindparam('_items'),
+                    done_count=db.bindparam('_done')),
+                [{'_id': row[0], '_items': row[1], '_done': row[2]}
+                 for row in drifted])
         db.session.commit()
-        return bucketlist
+        return len(drifted)
 
     @staticmethod
-    def delete_bucketlist(bucketlist_id):
-        try:
-            bucketlist = Bucketlist.query.filter_by(id=bucketlist_id).first()
-            if not bucketlist:
-                return "Bucketlist not found", 404
-        except InvalidQuery:
-            return "Query Error", 500
-        db.session.delete(bucketlist)
+    def changed_since(user_id, since=None):
+        """
+        Bucketlists of user_id modified at or after since, all of them
+        without since
+
+        """
+        query = Bucketlist.read_query().filter(Bucketlist.created_by == user_id)
+        if since is not None:
+            query = query.filter(Bucketlist.date_modified >= since)
+        return query.order_by(Bucketlist.id)
+
+    @staticmethod
+    def delete_bucketlist(bucketlist_id, user_id):
+        # One DELETE scoped to the owner, the database cascades to items.
+        # The tombstone is written first, in the same transaction.
+        DeletedRecord.record(db.select([
+            Bucketlist.created_by, db.literal('bucketlist'), Bucketlist.id,
+            Bucketlist.id.label('bucketlist_id')]).where(db.and_(
+                Bucketlist.id == bucketlist_id,
+                Bucketlist.created_by == user_id)))
+        count = Bucketlist.query.filter(
+            Bucketlist.id == bucketlist_id,
+            Bucketlist.created_by == user_id).delete(
+            synchronize_session=False)
         db.session.commit()
+        if not count:
+            return "Bucketlist not found", 404
+        publish_change(
+            user_id, 'bucketlist', 'deleted', [bucketlist_id], [bucketlist_id])
         return "Bucketlist successfully deleted", 200
 
 
 class Bucketlistitem(db.Model):
     __tablename__ = 'bucketlistitems'
+    __table_args__ = (
+        db.Index('ix_bucketlistitems_bucketlist_id_id', 'bucketlist_id', 'id'),
+        db.Index('ix_bucketlistitems_bucketlist_id_name',
+                 'bucketlist_id', 'name', unique=True),
+        db.Index('ix_bucketlistitems_bucketlist_id_date_modified',
+                 'bucketlist_id', 'date_modified'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100))
     done = db.Column(db.Boolean, default=False)
-    bucketlist_id = db.Column(db.Integer, db.ForeignKey('bucketlists.id'))
+    bucketlist_id = db.Column(
+        db.Integer, db.ForeignKey('bucketlists.id', ondelete='CASCADE'))
     date_created = db.Column(db.DateTime,
                              default=db.func.current_timestamp())
     date_modified = db.Column(
@@ -215,53 +683,363 @@ class Bucketlistitem(db.Model):
         self.done = done
 
     @staticmethod
-    def create_bucketlistitem(bucketlist_id, name, done):
+    def create_bucketlistitem(bucketlist_id, user_id, name, done):
+        """
+        Adds an item to a bucketlist owned by user_id with one
+        INSERT ... SELECT, which inserts nothing when the bucketlist
+        belongs to someone else. Names are unique within a bucketlist,
+        enforced by a unique index.
+
+        """
+        owned = db.select([
+            db.literal(name, Bucketlistitem.name.type),
+            db.literal(done, Bucketlistitem.done.type),
+            Bucketlist.id]).where(db.and_(
+                Bucketlist.id == bucketlist_id,
+                Bucketlist.created_by == user_id))
         try:
-            bucketlistitem = Bucketlistitem.query.filter_by(
-                name=name, bucketlist_id=bucketlist_id).first()
-            if bucketlistitem:
-                return "Item name already taken!", 200
-        except InvalidQuery:
-            return "query error", 500
-        bucketlistitem = Bucketlistitem(name, done, bucketlist_id)
-        db.session.add(bucketlistitem)
-        db.session.commit()
+            bucketlistitem = insert_returning(
+                Bucketlistitem.__table__, owned,
+                ['name', 'done', 'bucketlist_id'],
+                Bucketlistitem.read_columns())
+            if bucketlistitem is not None:
+                Bucketlist.count_items(bucketlist_id, 1, int(bool(done)))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return "Item name already taken!", 200
+        if bucketlistitem is None:
+            return "Bucketlist not found!", 404
+        publish_change(
+            user_id, 'item', 'created', [bucketlistitem.id], [bucketlist_id])
         return bucketlistitem
 
+    @staticmethod
+    def bulk_create_bucketlistitems(bucketlist_id, user_id, rows):
+        """
+        Creates many items in one bucketlist in a single transaction. rows
+        maps item names to their done flag. Names already used in the
+        bucketlist are found with one set based query and skipped, as
+        are rows that lose a race with a concurrent insert. Returns a
+        dict mapping each created name to its new id.
+
+        """
+        taken = set()
+        for chunk in chunked(rows):
+            taken.update(name for name, in db.session.query(
+                Bucketlistitem.name).filter(
+                Bucketlistitem.bucketlist_id == bucketlist_id,
+                Bucketlistitem.name.in_(chunk)))
+        new_names = [name for name in rows if name not in taken]
+        if new_names:
+            db.session.execute(
+                insert_ignoring_conflicts(Bucketlistitem.__table__),
+                [{'name': name, 'done': rows[name],
+                  'bucketlist_id': bucketlist_id} for name in new_names])
+        created = {}
+        for chunk in chunked(new_names):
+            created.update(db.session.query(
+                Bucketlistitem.name, Bucketlistitem.id).filter(
+                Bucketlistitem.bucketlist_id == bucketlist_id,
+                Bucketlistitem.name.in_(chunk)))
+        if created:
+            Bucketlist.count_items(
+                bucketlist_id, len(created),
+                sum(1 for name in created if rows[name]))
+        db.session.commit()
+        if created:
+            publish_change(
+                user_id, 'item', 'created', created.values(), [bucketlist_id])
+        return created
+
+    @staticmethod
+    def owned_by(bucketlist_id, user_id):
+        """
+        Condition matching the items of a bucketlist only when user_id
+        owns it
+
+        """
+        return db.and_(
+            Bucketlistitem.bucketlist_id == bucketlist_id,
+            Bucketlistitem.bucketlist_id.in_(
+                Bucketlist.owned(bucketlist_id, user_id)))
+
+    @staticmethod
+    def owned_items(bucketlist_id, user_id, item_ids=None, done=None):
+        """
+        Query of the items of a bucketlist owned by user_id, optionally
+        narrowed to some ids or to a done state
+
+        """
+        query = Bucketlistitem.query.filter(
+            Bucketlistitem.owned_by(bucketlist_id, user_id))
+        if item_ids is not None:
+            query = query.filter(Bucketlistitem.id.in_(item_ids))
+        if done is not None:
+            query = query.filter(Bucketlistitem.done == done)
+        return query
+
+    @staticmethod
+    def mark_bucketlistitems(bucketlist_id, user_id, done, item_ids=None):
+        """
+        Sets the done flag of many items, or of all items when no ids are
+        given, with one UPDATE statement. Only items whose flag flips are
+        matched, so the number of rows changed, which is returned, is
+        exactly what the done counter moves by.
+
+        """
+        count = Bucketlistitem.owned_items(
+            bucketlist_id, user_id, item_ids).filter(
+            db.func.coalesce(Bucketlistitem.done, db.false()) != done).update(
+            {Bucketlistitem.done: done}, synchronize_session=False)
+        if count:
+            Bucketlist.count_items(bucketlist_id, 0, count if done else -count)
+        db.session.commit()
+        if count:
+            publish_change(
+                user_id, 'item', 'updated', item_ids, [bucketlist_id])
+        return count
+
+    @staticmethod
+    def rename_bucketlistitems(bucketlist_id, user_id, names):
+        """
+        Renames many items with one UPDATE statement. names maps item ids
+        to their new names. Returns the number of rows changed, or an error
+        when a new name is already used in the bucketlist.
+
+        """
+        if not names:
+            return 0
+        try:
+            count = Bucketlistitem.owned_items(
+                bucketlist_id, user_id, list(names)).update(
+                {Bucketlistitem.name: db.case(names, value=Bucketlistitem.id)},
+                synchronize_session=False)
+            if count:
+                Bucketlist.count_items(bucketlist_id)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return "Item name already taken!", 409
+        if count:
+            publish_change(
+                user_id, 'item', 'updated', list(names), [bucketlist_id])
+        return count
+
+    @staticmethod
+    def delete_bucketlistitems(bucketlist_id, user_id, done=None, item_ids=None):
+        """
+        Deletes the matching items with one DELETE statement without
+        loading them, after recording their tombstones. Returns the number
+        of rows removed.
+
+        """
+        query = Bucketlistitem.owned_items(
+            bucketlist_id, user_id, item_ids, done)
+        DeletedRecord.record_items(query, user_id)
+        count = Bucketlistitem.delete_counted(bucketlist_id, query)
+        db.session.commit()
+        if count:
+            publish_change(
+                user_id, 'item', 'deleted', item_ids, [bucketlist_id])
+        return count
+
+    @staticmethod
+    def delete_counted(bucketlist_id, query):
+        """
+        Deletes the items matched by query and takes them off the counters
+        of their bucketlist, in the current transaction. Returns the number
+        of rows removed.
+
+        """
+        count, done = delete_counting(
+            Bucketlistitem.__table__, query.whereclause, Bucketlistitem.done)
+        if count:
+            Bucketlist.count_items(bucketlist_id, -count, -done)
+        return count
+
+    @staticmethod
+    def read_columns():
+        return (Bucketlistitem.id, Bucketlistitem.name, Bucketlistitem.done,
+                Bucketlistitem.bucketlist_id, Bucketlistitem.date_created,
+                Bucketlistitem.date_modified)
+
+    @staticmethod
+    def read_query():
+        """
+        Column-only counterpart of Bucketlist.read_query for items
+
+        """
+        return db.session.query(*Bucketlistitem.read_columns())
+
+    @staticmethod
+    def get_items_for_bucketlists(bucketlist_ids, limit=None):
+        """
+        Fetches the items of several bucketlists in one query and
+        groups them by bucketlist id. With a limit, at most that many items
+        are returned per bucketlist.
+
+        """
+        grouped = dict((bucketlist_id, []) for bucketlist_id in bucketlist_ids)
+        if not grouped:
+            return grouped
+        query = Bucketlistitem.read_query().filter(
+            Bucketlistitem.bucketlist_id.in_(list(grouped)))
+        if limit is None:
+            items = query.order_by(Bucketlistitem.id).all()
+        else:
+            position = db.func.row_number().over(
+                partition_by=Bucketlistitem.bucketlist_id,
+                order_by=Bucketlistitem.id).label('position')
+            ranked = query.add_columns(position).subquery()
+            items = db.session.query(ranked).filter(
+                ranked.c.position <= limit).order_by(ranked.c.id).all()
+        for item in items:
+            grouped[item.bucketlist_id].append(item)
+        return grouped
+
+    @staticmethod
+    def changed_since(user_id, since=None):
+        """
+        Items in the bucketlists of user_id modified at or after since, all
+        of them without since
+
+        """
+        query = Bucketlistitem.read_query().join(
+            Bucketlist, Bucketlist.id == Bucketlistitem.bucketlist_id).filter(
+            Bucketlist.created_by == user_id)
+        if since is not None:
+            query = query.filter(Bucketlistitem.date_modified >= since)
+        return query.order_by(Bucketlistitem.id)
+
     @staticmethod
     def update_bucketlistitem(
             bucketlistitem_id,
             bucketlist_id,
+            user_id,
             name=None,
             done=None):
-        try:
-            bucketlistitem = Bucketlistitem.query.filter_by(
-                id=bucketlistitem_id, bucketlist_id=bucketlist_id).first()
-            if not bucketlistitem:
-                return "Item not found!"
-        except InvalidQuery:
-            return "Query Error!", 500
+        """
+        Updates an item of a bucketlist owned by user_id with a single
+        UPDATE and returns the updated row. A new done flag only matches
+        when it flips the stored one, so the done counter moves by exactly
+        one; when it does not, the name is set by an UPDATE of its own.
+
+        """
+        condition = db.and_(
+            Bucketlistitem.id == bucketlistitem_id,
+            Bucketlistitem.owned_by(bucketlist_id, user_id))
+        values = {}
         if name:
-            bucketlistitem.name = name
-        if done:
-            bucketlistitem.done = done
-        bucketlistitem.bucketlist_id = bucketlist_id
-        db.session.add(bucketlistitem)
-        db.session.commit()
+            values['name'] = name
+        bucketlistitem = None
+        try:
+            if done is not None:
+                bucketlistitem = update_returning(
+                    Bucketlistitem.__table__, db.and_(
+                        condition, db.func.coalesce(
+                            Bucketlistitem.done, db.false()) != done),
+                    dict(values, done=done), Bucketlistitem.read_columns(),
+                    key=condition)
+                if bucketlistitem is not None:
+                    Bucketlist.count_items(bucketlist_id, 0, 1 if done else -1)
+            if bucketlistitem is None and values:
+                bucketlistitem = update_returning(
+                    Bucketlistitem.__table__, condition, values,
+                    Bucketlistitem.read_columns())
+                if bucketlistitem is not None:
+                    Bucketlist.count_items(bucketlist_id)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return "Item name already taken!", 409
+        if bucketlistitem is not None:
+            publish_change(user_id, 'item', 'updated',
+                           [bucketlistitem_id], [bucketlist_id])
+        else:
+            # Nothing to change, or no such item
+            bucketlistitem = db.session.execute(db.select(
+                list(Bucketlistitem.read_columns())).where(condition)).first()
+        if bucketlistitem is None:
+            return "Item not found!", 404
         return bucketlistitem
 
     @staticmethod
-    def delete_bucketlistitem(bucketlistitem_id, bucketlist_id):
-        try:
-            bucketlistitem = Bucketlistitem.query.filter_by(
-                id=bucketlistitem_id, bucketlist_id=bucketlist_id).first()
-            if not bucketlistitem:
-                return "Item not found!", 404
-        except BaseException:
-            return "Query Error!", 500
-        db.session.delete(bucketlistitem)
+    def delete_bucketlistitem(bucketlistitem_id, bucketlist_id, user_id):
+        # One DELETE that only matches items of the user's own bucketlist,
+        # preceded by its tombstone
+        query = Bucketlistitem.owned_items(
+            bucketlist_id, user_id, [bucketlistitem_id])
+        DeletedRecord.record_items(query, user_id)
+        count = Bucketlistitem.delete_counted(bucketlist_id, query)
         db.session.commit()
+        if not count:
+            return "Item not found!", 404
+        publish_change(
+            user_id, 'item', 'deleted', [bucketlistitem_id], [bucketlist_id])
         return "Bucketlistitem successfully deleted", 200
 
     def __repr__(self):
         return '<Bucketlist item %r>' % self.name
+
+
+class DeletedRecord(db.Model):
+    # Tombstones of deleted bucketlists and items, read by the sync endpoint
+    __tablename__ = 'deleted_records'
+    __table_args__ = (
+        db.Index('ix_deleted_records_user_id_deleted_at',
+                 'user_id', 'deleted_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False)
+    kind = db.Column(db.String(10), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    bucketlist_id = db.Column(db.Integer)
+    deleted_at = db.Column(
+        db.DateTime, default=db.func.current_timestamp(), nullable=False)
+
+    @staticmethod
+    def record(select):
+        """
+        Writes a tombstone for every row of select, which yields user_id,
+        kind, record_id and bucketlist_id, with one INSERT ... SELECT
+
+        """
+        db.session.execute(DeletedRecord.__table__.insert().from_select(
+            ['user_id', 'kind', 'record_id', 'bucketlist_id'], select))
+
+    @staticmethod
+    def record_items(query, user_id):
+        """
+        Writes tombstones for the items a query of Bucketlistitem matches
+
+        """
+        DeletedRecord.record(query.with_entities(
+            db.literal(user_id), db.literal('item'), Bucketlistitem.id,
+            Bucketlistitem.bucketlist_id).statement)
+
+    @staticmethod
+    def since(user_id, since):
+        return db.session.query(
+            DeletedRecord.kind, DeletedRecord.record_id,
+            DeletedRecord.bucketlist_id).filter(
+            DeletedRecord.user_id == user_id,
+            DeletedRecord.deleted_at >= since).order_by(DeletedRecord.id)
+
+    @staticmethod
+    def prune(days):
+        """
+        Drops tombstones older than days by the database clock, returns
+        how many were removed
+
+        """
+        now = db.session.query(db.func.current_timestamp()).scalar()
+        before = now - datetime.timedelta(days=days)
+        count = DeletedRecord.query.filter(
+            DeletedRecord.deleted_at < before).delete(
+            synchronize_session=False)
+        db.session.commit()
+        return count
@@ -0,0 +1,131 @@
+from sqlalchemy import Column, Integer, MetaData, Table, event, func, literal_column
+
+from bucketlist.extensions import db
+from bucketlist.models.models import Bucketlist
+
+# Trigram indexes cannot answer patterns shorter than one trigram.
+MIN_TERM_LENGTH = 3
+
+fts_table = Table(
+    'bucketlists_fts', MetaData(),
+    Column('rowid', Integer),
+    Column('rank'))
+
+
+def like_pattern(term):
+    """
+    Escapes LIKE wildcards in term and wraps it for a substring match
+    """
+    escaped = term.replace('\\', '\\\\').replace(
+        '%', '\\%').replace('_', '\\_')
+    return '%' + escaped + '%'
+
+
+class LikeSearchBackend(object):
+    """
+    Unindexed substring search, used where no dedicated backend exists
+    """
+
+    def install(self, connection):
+        pass
+
+    def uninstall(self, connection):
+        pass
+
+    def search(self, query, term):
+        return query.filter(
+            Bucketlist.name.like(like_pattern(term), escape='\\'))
+
+
+class SqliteSearchBackend(LikeSearchBackend):
+    """
+    FTS5 search with the trigram tokenizer. The index is an external
+    content table kept in sync with bucketlists by triggers, so every
+    insert, update and delete of a bucketlist is reflected in the same
+    transaction.
+    """
+
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS bucketlists_fts USING fts5("
+        "name, content='bucketlists', content_rowid='id', "
+        "tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS bucketlists_fts_insert "
+        "AFTER INSERT ON bucketlists BEGIN "
+        "INSERT INTO bucketlists_fts(rowid, name) VALUES (new.id, new.name); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS bucketlists_fts_delete "
+        "AFTER DELETE ON bucketlists BEGIN "
+        "INSERT INTO bucketlists_fts(bucketlists_fts, rowid, name) "
+        "VALUES ('delete', old.id, old.name); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS bucketlists_fts_update "
+        "AFTER UPDATE OF name ON bucketlists BEGIN "
+        "INSERT INTO bucketlists_fts(bucketlists_fts, rowid, name) "
+        "VALUES ('delete', old.id, old.name); "
+        "INSERT INTO bucketlists_fts(rowid, name) VALUES (new.id, new.name); "
+        "END",
+        "INSERT INTO bucketlists_fts(bucketlists_fts) VALUES ('rebuild')",
+    ]
+
+    def install(self, connection):
+        for statement in self.statements:
+            connection.execute(statement)
+
+    def uninstall(self, connection):
+        connection.execute("DROP TABLE IF EXISTS bucketlists_fts")
+
+    def search(self, query, term):
+        if len(term) < MIN_TERM_LENGTH:
+            return super(SqliteSearchBackend, self).search(query, term)
+        phrase = '"' + term.replace('"', '""') + '"'
+        return query.join(fts_table, fts_table.c.rowid == Bucketlist.id).filter(
+            literal_column('bucketlists_fts').op('MATCH')(phrase)).order_by(
+            fts_table.c.rank)
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    """
+    Trigram search served by a GIN index on bucketlists.name. PostgreSQL
+    maintains the index itself, results are ranked by similarity.
+    """
+
+    def install(self, connection):
+        connection.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_bucketlists_name_trgm "
+            "ON bucketlists USING gin (name gin_trgm_ops)")
+
+    def search(self, query, term):
+        return query.filter(
+            Bucketlist.name.ilike(like_pattern(term), escape='\\')).order_by(
+            func.similarity(Bucketlist.name, term).desc())
+
+
+backends = {
+    'sqlite': SqliteSearchBackend(),
+    'postgresql': PostgresSearchBackend(),
+}
+
+
+def get_backend(dialect_name):
+    return backends.get(dialect_name, LikeSearchBackend())
+
+
+def search_bucketlists(query, term):
+    """
+    Narrows a Bucketlist query down to the rows matching term, best
+    matches first
+    """
+    return get_backend(db.engine.dialect.name).search(query, term)
+
+
+def install_backend(target, connection, **kw):
+    get_backend(connection.dialect.name).install(connection)
+
+
+def uninstall_backend(target, connection, **kw):
+    get_backend(connection.dialect.name).uninstall(connection)
+
+
+event.listen(Bucketlist.__table__, 'after_create', install_backend)
+event.listen(Bucketlist.__table__, 'before_drop', uninstall_backend)
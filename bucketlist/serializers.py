@@ -0,0 +1,97 @@
+import json
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _stdlib_dumps(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def _ujson_dumps(data):
+    return ujson.dumps(data, escape_forward_slashes=False).encode('utf-8')
+
+
+backends = {'json': _stdlib_dumps}
+if ujson is not None:
+    backends['ujson'] = _ujson_dumps
+if orjson is not None:
+    backends['orjson'] = orjson.dumps
+
+# The fastest installed encoder wins, stdlib json is always available.
+backend_name = [name for name in ('orjson', 'ujson', 'json')
+                if name in backends][0]
+
+
+def set_backend(name):
+    """
+    Selects the JSON encoder used by dumps, one of the keys of backends
+    """
+    global backend_name
+    if name not in backends:
+        raise ValueError('JSON backend %r is not installed' % name)
+    backend_name = name
+
+
+def dumps(data):
+    """
+    Encodes data to JSON bytes with the selected backend
+    """
+    return backends[backend_name](data)
+
+
+def json_response(data, status=200, headers=None):
+    return Response(
+        dumps(data), status=status, headers=headers,
+        mimetype='application/json')
+
+
+def isoformat(value):
+    if value is None:
+        return None
+    return value.isoformat()
+
+
+def serialize_user(user):
+    return {
+        'user_id': user.id,
+        'username': user.username,
+        'email': user.email
+    }
+
+
+def serialize_item(item):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'done': item.done,
+        'date_created': isoformat(item.date_created),
+        'date_modified': isoformat(item.date_modified)
+    }
+
+
+def serialize_bucketlist(bucketlist, items=None):
+    """
+    Serializes a bucketlist, embedding items when they are given
+    """
+    result = {
+        'id': bucketlist.id,
+        'name': bucketlist.name,
+        'created_by': bucketlist.created_by,
+        'date_created': isoformat(bucketlist.date_created),
+        'date_modified': isoformat(bucketlist.date_modified),
+        'item_count': bucketlist.item_count,
+        'done_count': bucketlist.done_count
+    }
+    if items is not None:
+        result['items'] = [serialize_item(item) for item in items]
+    return result
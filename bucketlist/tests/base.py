@@ -1,4 +1,7 @@
+from contextlib import contextmanager
+
 from flask import json
+from sqlalchemy import event
 
 from bucketlist.app import create_app
 from bucketlist.extensions import db
@@ -28,6 +31,39 @@ class Initializer(object):
     def get_app(self):
         return self.app
 
+    @contextmanager
+    def statements(self):
+        """
+        Collects the SQL statements run on the database while the block
+        executes
+        """
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+    def login_as(self, username):
+        """
+        Registers and logs in another user, returning the headers of
+        their requests
+        """
+        client = self.app.test_client()
+        client.post('/auth/register', data=json.dumps({
+            "username": username, "email": username + "@example.com",
+            "password": "Password12"}), content_type='application/json')
+        login = client.post('/auth/login', data=json.dumps({
+            "username": username, "password": "Password12"}),
+            content_type='application/json')
+        return {"Token": json.loads(login.data.decode())['auth_token']}
+
     def register(self):
         """
         register user
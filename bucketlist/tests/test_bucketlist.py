@@ -2,6 +2,8 @@ import unittest
 
 from flask import json
 
+from bucketlist.extensions import db
+from bucketlist.models.models import Bucketlist, Bucketlistitem
 from bucketlist.tests.base import Initializer
 
 
@@ -115,3 +117,140 @@ class BucketlistTestCase(unittest.TestCase):
             'unauthorized action',
             bucketlists.get_data(
                 as_text=True))
+
+    def test_bucketlist_names_are_unique_per_user(self):
+        client = self.initializer.get_app().test_client()
+        login = self.initializer.login()
+        headers = {
+            "Token": json.loads(login.data.decode())['auth_token']
+        }
+        other_headers = self.initializer.login_as('other')
+
+        with self.initializer.statements() as statements:
+            first = client.post('/bucketlists/', headers=headers,
+                                data=json.dumps({"name": "travel"}),
+                                content_type='application/json')
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse([statement for statement in statements
+                          if 'bucketlists.name =' in statement])
+
+        again = client.post('/bucketlists/', headers=headers,
+                            data=json.dumps({"name": "travel"}),
+                            content_type='application/json')
+        self.assertIn('Bucketlist name already taken!',
+                      again.get_data(as_text=True))
+        other = client.post('/bucketlists/', headers=other_headers,
+                            data=json.dumps({"name": "travel"}),
+                            content_type='application/json')
+        self.assertEqual(json.loads(other.data.decode())['name'], "travel")
+
+    def count_listing_statements(self, headers, total):
+        """
+        Create bucketlists with an item each up to total and count the SQL
+        statements issued by a single listing request.
+        """
+        client = self.initializer.get_app().test_client()
+        existing = json.loads(client.get(
+            '/bucketlists/', headers=headers).data.decode()).get('bucketlists', [])
+        for index in range(len(existing) + 1, total + 1):
+            client.post('/bucketlists/', headers=headers,
+                        data=json.dumps({"name": "bucket %d" % index}),
+                        content_type='application/json')
+            client.post('/bucketlists/%d/items/' % index, headers=headers,
+                        data=json.dumps({"name": "item", "done": False}),
+                        content_type='application/json')
+
+        with self.initializer.statements() as statements:
+            response = client.get('/bucketlists/?limit=100', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(json.loads(response.data.decode())['bucketlists']), total)
+        return len(statements)
+
+    def test_listing_statement_count_is_constant(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token']
+        }
+        small_page = self.count_listing_statements(headers, 2)
+        large_page = self.count_listing_statements(headers, 8)
+        self.assertEqual(small_page, large_page)
+
+    def test_get_bucketlist_with_cursor(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token']
+        }
+        client = self.initializer.get_app().test_client()
+        for index in range(1, 6):
+            client.post('/bucketlists/', headers=headers,
+                        data=json.dumps({"name": "bucket %d" % index}),
+                        content_type='application/json')
+
+        names = []
+        cursor = ''
+        pages = []
+        while cursor is not None:
+            response = client.get(
+                '/bucketlists/?limit=2&cursor=' + cursor, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            page = json.loads(response.data.decode())
+            self.assertNotIn('pages', page)
+            names.extend(bucket['name'] for bucket in page['bucketlists'])
+            pages.append(page)
+            cursor = page['next_cursor']
+        self.assertEqual(names, ["bucket %d" % index for index in range(1, 6)])
+        self.assertIsNone(pages[0]['previous_cursor'])
+
+        response = client.get(
+            '/bucketlists/?limit=2&cursor=' + pages[-1]['previous_cursor'],
+            headers=headers)
+        page = json.loads(response.data.decode())
+        self.assertEqual([bucket['name'] for bucket in page['bucketlists']],
+                         ["bucket 3", "bucket 4"])
+
+        # Limits below one are raised to a single row
+        for limit in ('0', '-3'):
+            response = client.get(
+                '/bucketlists/?cursor=&limit=' + limit, headers=headers)
+            page = json.loads(response.data.decode())
+            self.assertEqual([bucket['name'] for bucket in page['bucketlists']],
+                             ["bucket 1"])
+            self.assertTrue(page['has_next'])
+
+    def test_get_bucketlist_with_invalid_cursor(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token']
+        }
+        response = self.initializer.get_app().test_client().get(
+            '/bucketlists/?cursor=notacursor', headers=headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('invalid cursor', response.get_data(as_text=True))
+
+    def test_read_path_skips_identity_map(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token']
+        }
+        client = self.initializer.get_app().test_client()
+        client.post('/bucketlists/', headers=headers,
+                    data=json.dumps({"name": "bucket 1"}),
+                    content_type='application/json')
+        client.post('/bucketlists/1/items/', headers=headers,
+                    data=json.dumps({"name": "item", "done": False}),
+                    content_type='application/json')
+
+        with self.initializer.get_app().app_context():
+            db.session.remove()
+            bucketlists = Bucketlist.read_query().all()
+            items = Bucketlistitem.get_items_for_bucketlists([1])
+            self.assertEqual(bucketlists[0].name, "bucket 1")
+            self.assertNotIsInstance(bucketlists[0], Bucketlist)
+            self.assertEqual(items[1][0].name, "item")
+            self.assertNotIsInstance(items[1][0], Bucketlistitem)
+            self.assertEqual(len(db.session.identity_map), 0)
@@ -2,6 +2,7 @@ import unittest
 
 from flask import json
 
+from bucketlist.extensions import response_cache
 from bucketlist.tests.base import Initializer
 
 
@@ -142,3 +143,151 @@ class BucketlistTestCase(unittest.TestCase):
             'Bucketlistitem successfully deleted',
             bucketlists.get_data(
                 as_text=True))
+
+    def test_unauthorized_requests_skip_the_database(self):
+        app = self.initializer.get_app()
+        client = app.test_client()
+        with self.initializer.statements() as statements:
+            responses = [
+                client.get('/bucketlists/1/items/'),
+                client.put('/bucketlists/1/items/1',
+                           headers={"Token": "invalid"},
+                           data=json.dumps({"name": "bucket 2"}),
+                           content_type='application/json'),
+                client.delete('/bucketlists/1/items/1'),
+            ]
+        for response in responses:
+            self.assertEqual(response.status_code, 401)
+            self.assertIn('unauthorized action',
+                          response.get_data(as_text=True))
+        self.assertEqual(statements, [])
+
+    def create_items(self, headers, count):
+        client = self.initializer.get_app().test_client()
+        client.post('/bucketlists/', headers=headers,
+                    data=json.dumps({"name": "bucket 1"}),
+                    content_type='application/json')
+        for index in range(count):
+            client.post('/bucketlists/1/items/', headers=headers,
+                        data=json.dumps({"name": "item %d" % index,
+                                         "done": index % 2 == 0}),
+                        content_type='application/json')
+        return client
+
+    def test_update_item_with_one_update_statement(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token'],
+        }
+        client = self.create_items(headers, 1)
+        with self.initializer.statements() as statements:
+            response = client.put('/bucketlists/1/items/1', headers=headers,
+                                  data=json.dumps({"done": False}),
+                                  content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(json.loads(response.data.decode())['done'])
+        self.assertTrue(statements[0].startswith('UPDATE bucketlistitems'))
+        self.assertEqual(
+            len([statement for statement in statements
+                 if statement.startswith('UPDATE bucketlistitems')]), 1)
+
+        other_headers = self.initializer.login_as('other')
+        response = client.put('/bucketlists/1/items/1', headers=other_headers,
+                              data=json.dumps({"name": "stolen"}),
+                              content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        response = client.put('/bucketlists/1', headers=other_headers,
+                              data=json.dumps({"name": "stolen"}),
+                              content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        response = client.get('/bucketlists/1', headers=headers)
+        self.assertEqual(json.loads(response.data.decode())['name'], "bucket 1")
+
+    def test_item_routes_are_scoped_to_the_owner(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token'],
+        }
+        client = self.create_items(headers, 1)
+        other_headers = self.initializer.login_as('other')
+
+        with self.initializer.statements() as statements:
+            response = client.post('/bucketlists/1/items/', headers=headers,
+                                   data=json.dumps({"name": "new item",
+                                                    "done": False}),
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode())['name'], "new item")
+        self.assertTrue(statements[0].startswith('INSERT'))
+
+        responses = [
+            client.get('/bucketlists/1/items/', headers=other_headers),
+            client.post('/bucketlists/1/items/', headers=other_headers,
+                        data=json.dumps({"name": "stolen", "done": False}),
+                        content_type='application/json'),
+            client.delete('/bucketlists/1/items/1', headers=other_headers),
+            client.delete('/bucketlists/1', headers=other_headers),
+        ]
+        for response in responses:
+            self.assertEqual(response.status_code, 404)
+        items = json.loads(client.get('/bucketlists/1/items/',
+                                      headers=headers).data.decode())
+        self.assertEqual([item['name'] for item in items],
+                         ["item 0", "new item"])
+
+    def test_paginate_items(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token'],
+        }
+        client = self.create_items(headers, 5)
+
+        names = []
+        url = '/bucketlists/1/items/?limit=2'
+        while url:
+            response = client.get(url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            names.extend(item['name']
+                         for item in json.loads(response.data.decode()))
+            url = None
+            for link in response.headers.get('Link', '').split(', '):
+                if link.endswith('rel="next"'):
+                    url = link[link.index('/bucketlists'):link.index('>')]
+        self.assertEqual(names, ["item %d" % index for index in range(5)])
+
+    def test_filter_items_by_done(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token'],
+        }
+        client = self.create_items(headers, 5)
+        response = client.get('/bucketlists/1/items/?done=false',
+                              headers=headers)
+        items = json.loads(response.data.decode())
+        self.assertEqual([item['name'] for item in items], ["item 1", "item 3"])
+        self.assertNotIn('Link', response.headers)
+
+    def test_embedded_items_are_capped(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        headers = {
+            "Token": data['auth_token'],
+        }
+        client = self.create_items(headers, 3)
+        self.initializer.get_app().config['ITEMS_EMBED_LIMIT'] = 2
+        bucket = json.loads(client.get(
+            '/bucketlists/1', headers=headers).data.decode())
+        self.assertEqual(len(bucket['items']), 2)
+        self.assertTrue(bucket['items_truncated'])
+        self.assertTrue(bucket['items_url'].endswith('/bucketlists/1/items/'))
+
+        self.initializer.get_app().config['ITEMS_EMBED_LIMIT'] = 3
+        response_cache.clear()
+        bucket = json.loads(client.get(
+            '/bucketlists/1', headers=headers).data.decode())
+        self.assertEqual(len(bucket['items']), 3)
+        self.assertFalse(bucket['items_truncated'])
@@ -2,6 +2,7 @@ import unittest
 
 from flask import json
 
+from bucketlist.models.models import Bucketlistitem, User
 from bucketlist.tests.base import Initializer
 
 
@@ -168,3 +169,29 @@ class BucketlistTestCase(unittest.TestCase):
             'unauthorized action',
             bucketlists.get_data(
                 as_text=True))
+
+    def test_delete_cascades_in_database(self):
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        output = {
+            "Token": data['auth_token'],
+        }
+        client = self.initializer.get_app().test_client()
+        client.post('/bucketlists/', headers=output,
+                    data=json.dumps({"name": "bucket 1"}),
+                    content_type='application/json')
+        client.post('/bucketlists/1/items/bulk', headers=output,
+                    data=json.dumps([{"name": "item %d" % index}
+                                     for index in range(10)]),
+                    content_type='application/json')
+
+        with self.initializer.statements() as statements:
+            bucketlists = client.delete('/bucketlists/1', headers=output)
+        self.assertEqual(bucketlists.status_code, 200)
+        self.assertFalse([statement for statement in statements
+                          if 'bucketlistitems' in statement])
+
+        with self.initializer.get_app().app_context():
+            self.assertEqual(Bucketlistitem.query.count(), 0)
+            User.delete_user(1)
+            self.assertEqual(User.query.count(), 0)
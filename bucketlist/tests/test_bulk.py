@@ -0,0 +1,94 @@
+import unittest
+
+from flask import json
+
+from bucketlist.tests.base import Initializer
+
+
+class BulkImportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        data = json.loads(self.initializer.login().data.decode())
+        self.headers = {
+            "Token": data['auth_token']
+        }
+        self.client = self.initializer.get_app().test_client()
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "bucket 1"}),
+                         content_type='application/json')
+        self.client.post('/bucketlists/1/items/', headers=self.headers,
+                         data=json.dumps({"name": "existing", "done": False}),
+                         content_type='application/json')
+
+    def post_items(self, data, content_type='application/json'):
+        response = self.client.post('/bucketlists/1/items/bulk',
+                                    headers=self.headers, data=data,
+                                    content_type=content_type)
+        return response, json.loads(response.data.decode())
+
+    def test_bulk_create_items(self):
+        rows = [
+            {"name": "item 1", "done": True},
+            {"name": "existing", "done": False},
+            {"name": "item 1"},
+            {"done": True},
+            {"name": "item 2"},
+        ]
+        response, result = self.post_items(json.dumps(rows))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([row['status'] for row in result['results']],
+                         [201, 409, 409, 400, 201])
+
+        items = json.loads(self.client.get(
+            '/bucketlists/1/items/', headers=self.headers).data.decode())
+        self.assertEqual([(item['name'], item['done']) for item in items],
+                         [("existing", False), ("item 1", True),
+                          ("item 2", False)])
+        self.assertEqual(result['results'][0]['id'], items[1]['id'])
+
+    def test_bulk_create_items_from_ndjson_and_csv(self):
+        _, result = self.post_items(
+            '{"name": "item 1", "done": true}\n{"name": "item 2"}\n',
+            'application/x-ndjson')
+        self.assertEqual(result['created'], 2)
+        _, result = self.post_items(
+            'name,done\nitem 3,true\nitem 4,\nitem 5,maybe\n', 'text/csv')
+        self.assertEqual([row['status'] for row in result['results']],
+                         [201, 201, 400])
+
+    def test_bulk_statement_count_is_constant(self):
+        counts = []
+        for size in (2, 20):
+            rows = [{"name": "item %d %d" % (size, index)}
+                    for index in range(size)]
+            with self.initializer.statements() as statements:
+                _, result = self.post_items(json.dumps(rows))
+            self.assertEqual(result['created'], size)
+            counts.append(len(statements))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_rejects_bad_payloads(self):
+        response, _ = self.post_items(json.dumps({"name": "item"}))
+        self.assertEqual(response.status_code, 400)
+        self.initializer.get_app().config['BULK_MAX_ROWS'] = 1
+        response, _ = self.post_items(json.dumps([{"name": "a"}, {"name": "b"}]))
+        self.assertEqual(response.status_code, 413)
+
+    def test_bulk_create_bucketlists(self):
+        response = self.client.post(
+            '/bucketlists/bulk', headers=self.headers,
+            data=json.dumps([{"name": "bucket 1"}, {"name": "bucket 2"}]),
+            content_type='application/json')
+        result = json.loads(response.data.decode())
+        self.assertEqual([row['status'] for row in result['results']],
+                         [409, 201])
+        self.assertEqual(result['results'][1]['id'], 2)
+
+    def test_bulk_items_of_missing_bucketlist(self):
+        response = self.client.post(
+            '/bucketlists/5/items/bulk', headers=self.headers,
+            data=json.dumps([{"name": "item"}]),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 404)
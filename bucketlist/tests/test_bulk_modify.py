@@ -0,0 +1,87 @@
+import unittest
+
+from flask import json
+
+from bucketlist.tests.base import Initializer
+
+
+class BulkModifyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        data = json.loads(self.initializer.login().data.decode())
+        self.headers = {
+            "Token": data['auth_token']
+        }
+        self.client = self.initializer.get_app().test_client()
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "bucket 1"}),
+                         content_type='application/json')
+        for index in range(1, 5):
+            self.client.post('/bucketlists/1/items/', headers=self.headers,
+                             data=json.dumps({"name": "item %d" % index,
+                                              "done": False}),
+                             content_type='application/json')
+
+    def patch(self, data):
+        response = self.client.patch('/bucketlists/1/items',
+                                     headers=self.headers,
+                                     data=json.dumps(data),
+                                     content_type='application/json')
+        return response
+
+    def items(self):
+        return [(item['id'], item['name'], item['done']) for item in
+                json.loads(self.client.get('/bucketlists/1/items/',
+                                           headers=self.headers).data.decode())]
+
+    def test_mark_items_done(self):
+        response = self.patch({"ids": [1, 3], "done": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode())['affected'], 2)
+        self.assertEqual([done for _, _, done in self.items()],
+                         [True, False, True, False])
+
+        # Only the items that were not done yet change
+        response = self.patch({"all": True, "done": True})
+        self.assertEqual(json.loads(response.data.decode())['affected'], 2)
+        self.assertTrue(all(done for _, _, done in self.items()))
+
+    def test_rename_items(self):
+        response = self.patch({"names": {"1": "first", "2": "second"}})
+        self.assertEqual(json.loads(response.data.decode())['affected'], 2)
+        self.assertEqual([name for _, name, _ in self.items()],
+                         ["first", "second", "item 3", "item 4"])
+
+    def test_rename_to_taken_name(self):
+        response = self.patch({"names": {"1": "item 2"}})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([name for _, name, _ in self.items()],
+                         ["item 1", "item 2", "item 3", "item 4"])
+
+    def test_delete_completed_items(self):
+        self.patch({"ids": [2, 4], "done": True})
+        response = self.client.delete('/bucketlists/1/items?done=true',
+                                      headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode())['affected'], 2)
+        self.assertEqual([item_id for item_id, _, _ in self.items()], [1, 3])
+
+    def test_invalid_bulk_requests(self):
+        self.assertEqual(self.patch({"done": True}).status_code, 400)
+        self.assertEqual(self.patch({"ids": [1]}).status_code, 400)
+        self.assertEqual(self.patch({"names": {"x": "a"}}).status_code, 400)
+        response = self.client.delete('/bucketlists/1/items',
+                                      headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_requests_respect_ownership(self):
+        headers = self.initializer.login_as('other')
+        response = self.client.patch('/bucketlists/1/items', headers=headers,
+                                     data=json.dumps({"all": True, "done": True}),
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.delete('/bucketlists/1/items?done=false',
+                                      headers=headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.items()), 4)
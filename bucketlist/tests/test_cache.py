@@ -0,0 +1,181 @@
+import time
+import unittest
+
+from flask import json
+
+from bucketlist.cache import LRUCacheBackend, RedisCacheBackend
+from bucketlist.extensions import db, response_cache
+from bucketlist.models.models import change_listeners, subscribe
+from bucketlist.tests.base import Initializer
+
+
+class FakeRedis(object):
+    """
+    The part of the Redis client protocol the cache backend uses
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, keys):
+        now = time.time()
+        return [self.data[key][0] if key in self.data and
+                self.data[key][1] > now else None for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and self.mget([key])[0] is not None:
+            return None
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self.data[key] = (value, time.time() + ex)
+        return True
+
+    def flushdb(self):
+        self.data.clear()
+
+
+class BrokenRedis(object):
+    """
+    A Redis client whose server is down
+    """
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError('Connection refused')
+        return fail
+
+
+class CacheBackendTestCase(unittest.TestCase):
+
+    def test_lru_backend(self):
+        backend = LRUCacheBackend(max_size=2)
+        backend.set('a', b'1', 60)
+        backend.set('b', b'2', 60)
+        backend.get_many(['a'])
+        backend.set('c', b'3', 60)
+        self.assertEqual(backend.get_many(['a', 'b', 'c']), [b'1', None, b'3'])
+        self.assertFalse(backend.add('a', b'x', 60))
+        backend.set('d', b'4', -1)
+        self.assertEqual(backend.get_many(['d']), [None])
+        self.assertTrue(backend.add('d', b'5', 60))
+
+    def test_redis_backend(self):
+        backend = RedisCacheBackend(FakeRedis())
+        backend.set('a', b'1', 60)
+        self.assertEqual(backend.get_many(['a', 'b']), [b'1', None])
+        self.assertFalse(backend.add('a', b'2', 60))
+        self.assertTrue(backend.add('b', b'2', 60))
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.app = self.initializer.get_app()
+        login = self.initializer.login()
+        self.headers = {
+            "Token": json.loads(login.data.decode())['auth_token']
+        }
+        self.client = self.app.test_client()
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "bucket 1"}),
+                         content_type='application/json')
+        self.client.post('/bucketlists/1/items/', headers=self.headers,
+                         data=json.dumps({"name": "item", "done": False}),
+                         content_type='application/json')
+
+    def tearDown(self):
+        response_cache.init_app(self.app)
+
+    def get(self, url, headers=None):
+        with self.initializer.statements() as statements:
+            response = self.client.get(url, headers=headers or self.headers)
+        return json.loads(response.data.decode()), len(statements)
+
+    def check_invalidation(self):
+        bucket, statements = self.get('/bucketlists/1')
+        self.assertGreater(statements, 1)
+        # only the freshness probe runs for a cached response
+        cached, statements = self.get('/bucketlists/1')
+        self.assertEqual(statements, 1)
+        self.assertEqual(cached, bucket)
+
+        self.client.put('/bucketlists/1/items/1', headers=self.headers,
+                        data=json.dumps({"done": True}),
+                        content_type='application/json')
+        bucket, _ = self.get('/bucketlists/1')
+        self.assertTrue(bucket['items'][0]['done'])
+
+        listing, _ = self.get('/bucketlists/')
+        cached, statements = self.get('/bucketlists/')
+        self.assertEqual(statements, 1)
+        self.assertEqual(cached, listing)
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "bucket 2"}),
+                         content_type='application/json')
+        listing, _ = self.get('/bucketlists/')
+        self.assertEqual([bucket['name'] for bucket in listing['bucketlists']],
+                         ["bucket 1", "bucket 2"])
+
+        self.client.delete('/bucketlists/1', headers=self.headers)
+        bucket, _ = self.get('/bucketlists/1')
+        self.assertEqual(bucket, {"message": "Bucketlist not found"})
+
+    def test_responses_are_cached_until_written(self):
+        self.check_invalidation()
+        stats = json.loads(self.client.get('/metrics').data.decode())
+        self.assertEqual(stats['response_cache']['hits'], 2)
+        self.assertGreater(stats['response_cache']['hit_ratio'], 0)
+
+    def test_redis_backend_serves_the_app(self):
+        response_cache.backend = RedisCacheBackend(FakeRedis())
+        self.check_invalidation()
+
+    def test_entries_are_per_user(self):
+        self.get('/bucketlists/1')
+        headers = self.initializer.login_as('other')
+        bucket, _ = self.get('/bucketlists/1', headers)
+        self.assertEqual(bucket, {"message": "Bucketlist not found"})
+
+    def test_unpublished_writes_are_never_served_stale(self):
+        # A write made by another worker never reaches this cache's
+        # invalidation, the freshness token in the key still misses
+        for url in ('/bucketlists/1', '/bucketlists/'):
+            self.get(url)
+        with self.app.app_context():
+            db.session.execute(
+                "UPDATE bucketlists SET name = 'renamed', "
+                "date_modified = datetime(date_modified, '+1 second')")
+            db.session.commit()
+        bucket, _ = self.get('/bucketlists/1')
+        self.assertEqual(bucket['name'], 'renamed')
+        listing, _ = self.get('/bucketlists/')
+        self.assertEqual(listing['bucketlists'][0]['name'], 'renamed')
+
+    def test_failing_backend_acts_as_an_empty_cache(self):
+        response_cache.backend = RedisCacheBackend(BrokenRedis())
+        response = self.client.post('/bucketlists/', headers=self.headers,
+                                    data=json.dumps({"name": "bucket 2"}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        for _ in range(2):
+            listing, _ = self.get('/bucketlists/')
+            self.assertEqual(len(listing['bucketlists']), 2)
+            bucket, _ = self.get('/bucketlists/2')
+            self.assertEqual(bucket['name'], "bucket 2")
+
+    def test_failing_listener_does_not_fail_the_write(self):
+        def listener(change):
+            raise RuntimeError('listener failed')
+
+        subscribe(listener)
+        try:
+            response = self.client.put(
+                '/bucketlists/1', headers=self.headers,
+                data=json.dumps({"name": "renamed"}),
+                content_type='application/json')
+        finally:
+            change_listeners.remove(listener)
+        self.assertEqual(response.status_code, 200)
+        bucket, _ = self.get('/bucketlists/1')
+        self.assertEqual(bucket['name'], "renamed")
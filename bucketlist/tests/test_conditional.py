@@ -0,0 +1,108 @@
+import unittest
+
+from flask import json
+
+from bucketlist.extensions import db
+from bucketlist.tests.base import Initializer
+
+
+class ConditionalGetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.app = self.initializer.get_app()
+        login = self.initializer.login()
+        self.headers = {
+            "Token": json.loads(login.data.decode())['auth_token']
+        }
+        self.client = self.app.test_client()
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "bucket 1"}),
+                         content_type='application/json')
+        self.client.post('/bucketlists/1/items/', headers=self.headers,
+                         data=json.dumps({"name": "item 1", "done": False}),
+                         content_type='application/json')
+
+    def get(self, url, **headers):
+        headers.update(self.headers)
+        with self.initializer.statements() as statements:
+            response = self.client.get(url, headers=headers)
+        return response, len(statements)
+
+    def test_etag_revalidation(self):
+        for url in ('/bucketlists/', '/bucketlists/1', '/bucketlists/1/items/'):
+            response, _ = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers['ETag']
+            self.assertTrue(etag.startswith('W/'))
+            self.assertIn('Last-Modified', response.headers)
+
+            response, statements = self.get(url, **{'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.get_data(), b'')
+            self.assertEqual(statements, 1)
+
+    def test_writes_change_the_etag(self):
+        response, _ = self.get('/bucketlists/1/items/')
+        etag = response.headers['ETag']
+
+        self.client.delete('/bucketlists/1/items/1', headers=self.headers)
+        response, _ = self.get('/bucketlists/1/items/', **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+        etag = response.headers['ETag']
+        self.client.post('/bucketlists/1/items/', headers=self.headers,
+                         data=json.dumps({"name": "item 2", "done": False}),
+                         content_type='application/json')
+        response, _ = self.get('/bucketlists/1/items/', **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_same_second_writes_change_the_etag(self):
+        writes = [
+            ('put', '/bucketlists/1/items/1', {"name": "item 2"}),
+            ('put', '/bucketlists/1/items/1', {"done": True}),
+            ('patch', '/bucketlists/1/items', {"ids": [1], "done": False}),
+            ('patch', '/bucketlists/1/items', {"names": {"1": "item 3"}}),
+            ('put', '/bucketlists/1', {"name": "bucket 2"}),
+        ]
+        for method, url, data in writes:
+            self.stop_the_clock()
+            etags = dict((path, self.get(path)[0].headers['ETag'])
+                         for path in ('/bucketlists/', '/bucketlists/1',
+                                      '/bucketlists/1/items/'))
+            getattr(self.client, method)(url, headers=self.headers,
+                                         data=json.dumps(data),
+                                         content_type='application/json')
+            self.stop_the_clock()
+            for path, etag in etags.items():
+                response, _ = self.get(path, **{'If-None-Match': etag})
+                self.assertEqual(response.status_code, 200, (url, data, path))
+
+    def stop_the_clock(self):
+        """Gives every row the same date_modified, as within one second"""
+        with self.app.app_context():
+            for table in ('bucketlists', 'bucketlistitems'):
+                db.session.execute("UPDATE %s SET date_modified = "
+                                   "'2026-01-01 00:00:00'" % table)
+            db.session.commit()
+
+    def test_etag_depends_on_the_query(self):
+        first, _ = self.get('/bucketlists/?limit=10')
+        second, _ = self.get('/bucketlists/?limit=20')
+        self.assertNotEqual(first.headers['ETag'], second.headers['ETag'])
+
+    def test_if_modified_since(self):
+        response, _ = self.get('/bucketlists/')
+        last_modified = response.headers['Last-Modified']
+        response, statements = self.get(
+            '/bucketlists/', **{'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(statements, 1)
+        response, _ = self.get(
+            '/bucketlists/', **{'If-Modified-Since': 'Thu, 01 Jan 2015 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_bucketlist_is_not_conditional(self):
+        response, _ = self.get('/bucketlists/2', **{'If-None-Match': '*'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,102 @@
+import unittest
+
+from flask import json
+
+from bucketlist.extensions import db
+from bucketlist.models.models import Bucketlist
+from bucketlist.tests.base import Initializer
+
+
+class ItemCountTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.app = self.initializer.get_app()
+        login = self.initializer.login()
+        self.headers = {
+            "Token": json.loads(login.data.decode())['auth_token']
+        }
+        self.client = self.app.test_client()
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "bucket 1"}),
+                         content_type='application/json')
+
+    def counts(self):
+        response = self.client.get('/bucketlists/', headers=self.headers)
+        bucket = json.loads(response.data.decode())['bucketlists'][0]
+        return bucket['item_count'], bucket['done_count']
+
+    def test_counts_follow_item_writes(self):
+        self.assertEqual(self.counts(), (0, 0))
+        self.client.post('/bucketlists/1/items/', headers=self.headers,
+                         data=json.dumps({"name": "item 1", "done": True}),
+                         content_type='application/json')
+        self.client.post('/bucketlists/1/items/bulk', headers=self.headers,
+                         data=json.dumps([
+                             {"name": "item 2", "done": True},
+                             {"name": "item 3"}, {"name": "item 1"}]),
+                         content_type='application/json')
+        self.assertEqual(self.counts(), (3, 2))
+
+        self.client.put('/bucketlists/1/items/3', headers=self.headers,
+                        data=json.dumps({"done": True}),
+                        content_type='application/json')
+        self.assertEqual(self.counts(), (3, 3))
+
+        self.client.patch('/bucketlists/1/items', headers=self.headers,
+                          data=json.dumps({"ids": [1, 2], "done": False}),
+                          content_type='application/json')
+        self.assertEqual(self.counts(), (3, 1))
+
+        self.client.delete('/bucketlists/1/items/1', headers=self.headers)
+        self.assertEqual(self.counts(), (2, 1))
+
+        self.client.delete('/bucketlists/1/items/?done=true',
+                           headers=self.headers)
+        self.assertEqual(self.counts(), (1, 0))
+
+    def test_repeated_writes_count_once(self):
+        self.client.post('/bucketlists/1/items/bulk', headers=self.headers,
+                         data=json.dumps([{"name": "item 1", "done": True},
+                                          {"name": "item 2"}]),
+                         content_type='application/json')
+        for _ in range(2):
+            response = self.client.put(
+                '/bucketlists/1/items/1', headers=self.headers,
+                data=json.dumps({"done": True}),
+                content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.client.patch('/bucketlists/1/items', headers=self.headers,
+                              data=json.dumps({"all": True, "done": True}),
+                              content_type='application/json')
+        self.assertEqual(self.counts(), (2, 2))
+
+        # A rename still applies when done is already in that state
+        response = self.client.put('/bucketlists/1/items/1', headers=self.headers,
+                                   data=json.dumps({"name": "first",
+                                                    "done": True}),
+                                   content_type='application/json')
+        self.assertEqual(json.loads(response.data.decode())['name'], "first")
+        self.client.delete('/bucketlists/1/items/?ids=1&ids=1&ids=7',
+                           headers=self.headers)
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_repair_counts(self):
+        for name in ("item 1", "item 2"):
+            self.client.post('/bucketlists/1/items/', headers=self.headers,
+                             data=json.dumps({"name": name, "done": True}),
+                             content_type='application/json')
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "bucket 2"}),
+                         content_type='application/json')
+        with self.app.app_context():
+            db.session.execute(
+                'UPDATE bucketlists SET item_count = 7, done_count = 5')
+            db.session.commit()
+            self.assertEqual(Bucketlist.repair_counts(), 2)
+            self.assertEqual(Bucketlist.repair_counts(), 0)
+            self.assertEqual(
+                db.session.query(Bucketlist.id, Bucketlist.item_count,
+                                 Bucketlist.done_count).order_by(
+                    Bucketlist.id).all(),
+                [(1, 2, 2), (2, 0, 0)])
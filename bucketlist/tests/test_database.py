@@ -0,0 +1,58 @@
+import unittest
+
+from flask import json
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+from bucketlist.database import PoolStats, ping_connection
+from bucketlist.extensions import db
+from bucketlist.tests.base import Initializer
+
+
+class DatabaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.app = self.initializer.get_app()
+
+    def test_driver_options(self):
+        options = {'pool_size': 5, 'max_overflow': 10, 'pool_recycle': 1800}
+        db.apply_driver_hacks(
+            self.app, make_url('sqlite:////tmp/test.db'), options)
+        self.assertNotIn('pool_size', options)
+        self.assertNotIn('max_overflow', options)
+        self.assertEqual(options['connect_args']['timeout'], 30.0)
+
+        options = {'pool_size': 5}
+        db.apply_driver_hacks(
+            self.app, make_url('postgresql://localhost/bucketlist'), options)
+        self.assertEqual(options['pool_size'], 5)
+        self.assertEqual(options['connect_args']['options'],
+                         '-c statement_timeout=30000')
+
+    def test_stale_connections_are_replaced(self):
+        engine = create_engine(
+            'sqlite:////tmp/test_pool.db', poolclass=QueuePool, pool_size=2)
+        stats = PoolStats(engine)
+        event.listen(engine.pool, 'checkout', ping_connection)
+
+        connection = engine.connect()
+        self.assertEqual(stats.stats()['checked_out'], 1)
+        connection.connection.connection.close()
+        connection.close()
+
+        self.assertEqual(engine.scalar('SELECT 1'), 1)
+        result = stats.stats()
+        self.assertEqual(result['invalidations'], 1)
+        self.assertEqual(result['connects'], 2)
+        self.assertEqual(result['checked_out'], 0)
+        engine.dispose()
+
+    def test_metrics_endpoint(self):
+        self.initializer.login()
+        response = self.app.test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertIn('checkouts', data['database_pools']['default'])
+        self.assertEqual(data['token_cache']['max_size'], 1024)
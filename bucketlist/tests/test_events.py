@@ -0,0 +1,165 @@
+import json as stdlib_json
+import queue
+import time
+import unittest
+
+from flask import json
+
+from bucketlist.events import EventBroker, RedisEventBackend, stream_events
+from bucketlist.extensions import event_broker
+from bucketlist.models.models import Change
+from bucketlist.tests.base import Initializer
+
+
+class FakePubSub(object):
+
+    def __init__(self, server):
+        self.server = server
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.server.subscribers.setdefault(channel, []).append(self)
+
+    def listen(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                return
+            if message == 'drop':
+                raise ConnectionError('Connection reset by peer')
+            yield message
+
+    def close(self):
+        self.messages.put(None)
+
+
+class FakeRedis(object):
+    """Just enough of the redis client for pub/sub between two brokers"""
+
+    def __init__(self):
+        self.subscribers = {}
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def drop_connections(self):
+        for pubsubs in self.subscribers.values():
+            for pubsub in pubsubs:
+                pubsub.messages.put('drop')
+        self.subscribers.clear()
+
+    def publish(self, channel, data):
+        for pubsub in self.subscribers.get(channel, []):
+            pubsub.messages.put({'type': 'message', 'data': data.encode('utf-8')})
+
+
+class EventStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.app = self.initializer.get_app()
+        login = self.initializer.login()
+        self.headers = {
+            "Token": json.loads(login.data.decode())['auth_token']
+        }
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        event_broker.init_app(self.app)
+
+    def open_stream(self):
+        response = self.client.get(
+            '/bucketlists/stream', headers=self.headers, buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = iter(response.response)
+        self.assertEqual(next(chunks), b'retry: 5000\n\n')
+        return response, chunks
+
+    @staticmethod
+    def parse(chunk):
+        fields = dict(line.split(': ', 1)
+                      for line in chunk.decode('utf-8').strip().split('\n'))
+        fields['data'] = stdlib_json.loads(fields['data'])
+        return fields
+
+    def test_changes_are_pushed(self):
+        response, chunks = self.open_stream()
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "bucket 1"}),
+                         content_type='application/json')
+        self.client.delete('/bucketlists/1', headers=self.headers)
+
+        created = self.parse(next(chunks))
+        self.assertEqual(created['event'], 'change')
+        self.assertEqual(created['data'], {
+            'kind': 'bucketlist', 'action': 'created', 'ids': [1],
+            'bucketlist_ids': [1]})
+        deleted = self.parse(next(chunks))
+        self.assertEqual(deleted['data']['action'], 'deleted')
+        self.assertGreater(int(deleted['id']), int(created['id']))
+
+        self.assertEqual(event_broker.stats()['streams'], 1)
+        response.close()
+        self.assertEqual(event_broker.stats()['streams'], 0)
+
+    def test_other_users_changes_are_not_pushed(self):
+        response, chunks = self.open_stream()
+        event_broker.on_change(Change(99, 'bucketlist', 'created', [1], [1]))
+        event_broker.heartbeat = 0.01
+        self.assertEqual(next(chunks), b': heartbeat\n\n')
+        response.close()
+
+    def test_slow_stream_is_told_to_resync(self):
+        event_broker.queue_size = 1
+        response, chunks = self.open_stream()
+        for name in ("bucket 1", "bucket 2"):
+            self.client.post('/bucketlists/', headers=self.headers,
+                             data=json.dumps({"name": name}),
+                             content_type='application/json')
+        self.assertEqual(next(chunks), b'event: resync\ndata: {}\n\n')
+        self.assertRaises(StopIteration, next, chunks)
+        self.assertEqual(event_broker.stats()['dropped'], 1)
+        self.assertEqual(event_broker.stats()['streams'], 0)
+
+    def test_stream_requires_token(self):
+        response = self.client.get('/bucketlists/stream')
+        self.assertEqual(response.status_code, 401)
+
+
+class RedisEventBackendTestCase(unittest.TestCase):
+
+    def test_events_cross_workers(self):
+        server = FakeRedis()
+        brokers = [EventBroker(), EventBroker()]
+        for broker in brokers:
+            broker.backend = RedisEventBackend(server, broker.deliver)
+        subscription = brokers[1].subscribe(7)
+        brokers[0].on_change(Change(7, 'item', 'updated', [3], [2]))
+
+        event = subscription.get(timeout=1)
+        self.assertEqual(event['kind'], 'item')
+        self.assertEqual(event['ids'], [3])
+        self.assertIsNone(subscription.get(timeout=0.01))
+        for broker in brokers:
+            broker.backend.close()
+
+    def test_lost_connection_resyncs_and_reconnects(self):
+        server = FakeRedis()
+        broker = EventBroker(heartbeat=1)
+        broker.backend = RedisEventBackend(
+            server, broker.deliver, lost=broker.resync, backoff=0.01)
+        chunks = stream_events(broker, 7)
+        next(chunks)
+        server.drop_connections()
+        self.assertEqual(next(chunks), b'event: resync\ndata: {}\n\n')
+
+        for _ in range(100):
+            if server.subscribers:
+                break
+            time.sleep(0.01)
+        subscription = broker.subscribe(7)
+        broker.on_change(Change(7, 'item', 'deleted', [3], [2]))
+        self.assertEqual(subscription.get(timeout=1)['action'], 'deleted')
+        self.assertEqual(broker.stats()['reconnects'], 1)
+        broker.backend.close()
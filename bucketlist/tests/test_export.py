@@ -0,0 +1,48 @@
+import gzip
+import unittest
+
+from flask import json
+
+from bucketlist.tests.base import Initializer
+
+
+class ExportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        data = json.loads(self.initializer.login().data.decode())
+        self.headers = {
+            "Token": data['auth_token']
+        }
+        self.client = self.initializer.get_app().test_client()
+        for name in ("bucket 1", "bucket 2"):
+            self.client.post('/bucketlists/', headers=self.headers,
+                             data=json.dumps({"name": name}),
+                             content_type='application/json')
+        for name in ("item 1", "item 2"):
+            self.client.post('/bucketlists/1/items/', headers=self.headers,
+                             data=json.dumps({"name": name, "done": False}),
+                             content_type='application/json')
+
+    def test_export_ndjson(self):
+        response = self.client.get('/bucketlists/export', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in
+                 response.get_data(as_text=True).splitlines()]
+        self.assertEqual([bucket['name'] for bucket in lines],
+                         ["bucket 1", "bucket 2"])
+        self.assertEqual([item['name'] for item in lines[0]['items']],
+                         ["item 1", "item 2"])
+        self.assertEqual(lines[1]['items'], [])
+
+    def test_export_gzip(self):
+        plain = self.client.get('/bucketlists/export', headers=self.headers)
+        compressed = self.client.get('/bucketlists/export?gzip=true',
+                                     headers=self.headers)
+        self.assertEqual(compressed.headers.get('Content-Encoding'), 'gzip')
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+
+    def test_unauthorized_export(self):
+        response = self.client.get('/bucketlists/export')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,41 @@
+import unittest
+
+from flask import json
+
+from bucketlist.extensions import password_hasher
+from bucketlist.tests.base import Initializer
+
+
+class PasswordHasherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+
+    def tearDown(self):
+        password_hasher.init_app(self.initializer.get_app())
+
+    def test_login_through_process_pool(self):
+        password_hasher.configure(workers=1, max_pending=1, rounds=4)
+        login = self.initializer.login()
+        self.assertEqual(login.status_code, 200)
+        self.assertIn('auth_token', login.get_data(as_text=True))
+
+    def test_saturated_pool_rejects_quickly(self):
+        password_hasher.configure(workers=0, max_pending=0, retry_after=3)
+        self.assertTrue(password_hasher._slots.acquire(False))
+        try:
+            register = self.initializer.register()
+        finally:
+            password_hasher._slots.release()
+        self.assertEqual(register.status_code, 503)
+        self.assertEqual(register.headers.get('Retry-After'), '3')
+        self.assertIn('Server busy', register.get_data(as_text=True))
+
+    def test_wrong_password_through_process_pool(self):
+        password_hasher.configure(workers=1, max_pending=1, rounds=4)
+        self.initializer.register()
+        login = self.initializer.get_app().test_client().post(
+            '/auth/login',
+            data=json.dumps({"username": "tester", "password": "Wrong1234"}),
+            content_type='application/json')
+        self.assertEqual(login.status_code, 401)
@@ -0,0 +1,102 @@
+import os
+import unittest
+
+from flask_migrate import stamp, upgrade
+
+from bucketlist.app import create_app
+from bucketlist.config import TestingConfig, app_config
+from bucketlist.extensions import db
+
+MIGRATIONS = os.path.join(
+    os.path.dirname(__file__), os.pardir, os.pardir, 'migrations')
+DATABASE = '/tmp/test_migrations.db'
+
+BASELINE_SCHEMA = [
+    "CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, "
+    "email VARCHAR(120) NOT NULL, password VARCHAR(255) NOT NULL, "
+    "PRIMARY KEY (id), UNIQUE (username), UNIQUE (email), UNIQUE (password))",
+    "CREATE TABLE bucketlists (id INTEGER NOT NULL, name VARCHAR(50), "
+    "created_by INTEGER, date_created DATETIME, date_modified DATETIME, "
+    "PRIMARY KEY (id), FOREIGN KEY(created_by) REFERENCES users (id))",
+    "CREATE TABLE bucketlistitems (id INTEGER NOT NULL, name VARCHAR(100), "
+    "done BOOLEAN, bucketlist_id INTEGER, date_created DATETIME, "
+    "date_modified DATETIME, PRIMARY KEY (id), "
+    "FOREIGN KEY(bucketlist_id) REFERENCES bucketlists (id))",
+]
+
+
+class MigrationConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + DATABASE
+
+
+class MigrationTestCase(unittest.TestCase):
+    """
+    Runs the migrations against a database of its own, which the app
+    points at from the moment it is created
+    """
+
+    def setUp(self):
+        if os.path.exists(DATABASE):
+            os.remove(DATABASE)
+        app_config['migrations'] = MigrationConfig
+
+    def tearDown(self):
+        del app_config['migrations']
+
+    @staticmethod
+    def create_app():
+        return create_app("migrations")
+
+    def tables(self):
+        return set(db.engine.table_names())
+
+    def test_app_startup_leaves_the_schema_alone(self):
+        with self.create_app().app_context():
+            self.assertEqual(self.tables(), set())
+
+    def test_upgrade_renames_duplicates_to_fit(self):
+        long_name = 'x' * 50
+        with self.create_app().app_context():
+            for statement in BASELINE_SCHEMA:
+                db.engine.execute(statement)
+            db.engine.execute(
+                "INSERT INTO users (id, username, email, password) "
+                "VALUES (1, 'tester', 'tester@example.com', 'secret')")
+            for row_id, name in ((1, 'trip'), (2, 'trip'), (3, 'trip (2)'),
+                                 (4, long_name), (5, long_name), (6, None),
+                                 (7, None)):
+                db.engine.execute(
+                    "INSERT INTO bucketlists (id, name, created_by) "
+                    "VALUES (?, ?, 1)", (row_id, name))
+            stamp(MIGRATIONS, revision='47fc3ce1d7dc')
+            upgrade(MIGRATIONS)
+            names = [name for name, in db.engine.execute(
+                'SELECT name FROM bucketlists ORDER BY id')]
+        self.assertEqual(names, [
+            'trip', 'trip (2-2)', 'trip (2)', long_name,
+            'x' * 46 + ' (5)', None, None])
+
+    def test_upgrade_baseline_schema(self):
+        # A database created by the first release's db.create_all(), with
+        # unnamed foreign keys and a unique password column, then stamped
+        # as the README describes
+        with self.create_app().app_context():
+            for statement in BASELINE_SCHEMA:
+                db.engine.execute(statement)
+            stamp(MIGRATIONS, revision='47fc3ce1d7dc')
+        with self.create_app().app_context():
+            upgrade(MIGRATIONS)
+            inspector = db.inspect(db.engine)
+            self.assertTrue({'refresh_tokens', 'deleted_records'} <=
+                            set(inspector.get_table_names()))
+            columns = [column['name'] for column in
+                       inspector.get_columns('bucketlists')]
+            self.assertIn('item_count', columns)
+            self.assertIn('version', columns)
+            self.assertEqual(
+                [constraint['column_names'] for constraint in
+                 inspector.get_unique_constraints('users')
+                 if 'password' in constraint['column_names']], [])
+            self.assertEqual(
+                [key['options'].get('ondelete') for key in
+                 inspector.get_foreign_keys('bucketlistitems')], ['CASCADE'])
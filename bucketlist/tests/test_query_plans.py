@@ -0,0 +1,55 @@
+import unittest
+
+from bucketlist.extensions import db
+from bucketlist.models.models import Bucketlist, Bucketlistitem
+from bucketlist.tests.base import Initializer
+
+
+class QueryPlanTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.context = self.initializer.get_app().app_context()
+        self.context.push()
+        if db.engine.dialect.name != 'sqlite':
+            self.context.pop()
+            self.skipTest('query plans are checked on SQLite')
+
+    def tearDown(self):
+        self.context.pop()
+
+    def plan(self, query):
+        statement = query.statement.compile(
+            dialect=db.engine.dialect,
+            compile_kwargs={'literal_binds': True})
+        return ' '.join(
+            row[-1] for row in
+            db.session.execute('EXPLAIN QUERY PLAN %s' % statement))
+
+    def test_bucketlist_pages_use_owner_index(self):
+        plan = self.plan(Bucketlist.read_query().filter(
+            Bucketlist.created_by == 1, Bucketlist.id > 10).order_by(
+            Bucketlist.id))
+        self.assertIn('USING INDEX ix_bucketlists_created_by_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_recent_bucketlists_use_modified_index(self):
+        plan = self.plan(Bucketlist.read_query().filter(
+            Bucketlist.created_by == 1).order_by(
+            Bucketlist.date_modified.desc()))
+        self.assertIn(
+            'USING INDEX ix_bucketlists_created_by_date_modified', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_item_pages_use_bucketlist_index(self):
+        plan = self.plan(Bucketlistitem.read_query().filter(
+            Bucketlistitem.bucketlist_id == 1).order_by(Bucketlistitem.id))
+        self.assertIn('USING INDEX ix_bucketlistitems_bucketlist_id_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_item_name_lookup_uses_name_index(self):
+        plan = self.plan(Bucketlistitem.query.filter_by(
+            name='item', bucketlist_id=1))
+        self.assertIn(
+            'USING INDEX ix_bucketlistitems_bucketlist_id_name', plan)
+
@@ -0,0 +1,50 @@
+import unittest
+
+from flask import json
+
+from bucketlist.tests.base import Initializer
+
+
+class RefreshTestCase(unittest.TestCase):
+    """Test case for refresh tokens."""
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.client = self.initializer.get_app().test_client()
+        login = self.initializer.login()
+        self.assertEqual(login.status_code, 200)
+        self.tokens = json.loads(login.data.decode())
+
+    def refresh(self, token, method='post'):
+        return getattr(self.client, method)(
+            '/auth/refresh',
+            data=json.dumps({"refresh_token": token}),
+            content_type='application/json')
+
+    def test_refresh_access_token(self):
+        result = self.refresh(self.tokens['refresh_token'])
+        self.assertEqual(result.status_code, 200)
+        access_token = json.loads(result.data.decode())['auth_token']
+        bucketlists = self.client.get(
+            '/bucketlists/', headers={"Token": access_token})
+        self.assertEqual(bucketlists.status_code, 200)
+
+    def test_refresh_token_is_not_an_access_token(self):
+        bucketlists = self.client.get(
+            '/bucketlists/', headers={"Token": self.tokens['refresh_token']})
+        self.assertEqual(bucketlists.status_code, 401)
+
+    def test_access_token_is_not_a_refresh_token(self):
+        result = self.refresh(self.tokens['auth_token'])
+        self.assertEqual(result.status_code, 401)
+
+    def test_revoked_refresh_token(self):
+        revoke = self.refresh(self.tokens['refresh_token'], method='delete')
+        self.assertEqual(revoke.status_code, 200)
+        result = self.refresh(self.tokens['refresh_token'])
+        self.assertEqual(result.status_code, 401)
+        self.assertIn('revoked', result.get_data(as_text=True))
+
+    def test_invalid_refresh_token(self):
+        self.assertEqual(self.refresh('invalid').status_code, 401)
+        self.assertEqual(self.refresh(None).status_code, 400)
@@ -59,6 +59,7 @@ class RegisterTestCase(unittest.TestCase):
         self.assertEqual(initial.status_code, 201)
         result = self.initializer.register()
         self.assertEqual(result.status_code, 202)
+        self.assertEqual(json.loads(result.data.decode()), "user already exists")
 
     def test_already_registered_email(self):
         """
@@ -70,6 +71,7 @@ class RegisterTestCase(unittest.TestCase):
                                                                data=json.dumps(self.same_email),
                                                                content_type='application/json')
         self.assertEqual(result.status_code, 202)
+        self.assertEqual(json.loads(result.data.decode()), "email already exists")
 
     def test_reg_pass_validation(self):
         """
@@ -0,0 +1,88 @@
+import unittest
+
+from flask import json
+
+from bucketlist.extensions import db, replica_router, response_cache
+from bucketlist.tests.base import Initializer
+
+
+class ReplicaTestCase(unittest.TestCase):
+    """
+    Two SQLite files stand in for the primary and the replica. The replica
+    holds different rows, so each response shows where it was read from;
+    the response cache is off to keep it from answering instead.
+    """
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.app = self.initializer.get_app()
+        response_cache.ttl = 0
+        self.app.config['SQLALCHEMY_BINDS'] = {
+            'replica': 'sqlite:////tmp/test_replica.db'
+        }
+        with self.app.app_context():
+            replica = db.get_engine(self.app, bind='replica')
+            db.metadata.drop_all(bind=replica)
+            db.metadata.create_all(bind=replica)
+            replica.execute(
+                "INSERT INTO users (id, username, email, password) "
+                "VALUES (1, 'tester', 'test@example.com', 'x')")
+            replica.execute(
+                "INSERT INTO bucketlists (id, name, created_by) "
+                "VALUES (1, 'replica bucket', 1)")
+        login = self.initializer.login()
+        self.headers = {
+            "Token": json.loads(login.data.decode())['auth_token']
+        }
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.app.config['SQLALCHEMY_BINDS'] = None
+        replica_router.clear()
+        response_cache.init_app(self.app)
+
+    def expire_window(self):
+        replica_router.clear()
+        self.client.cookie_jar.clear()
+
+    def names(self):
+        response = self.client.get('/bucketlists/1', headers=self.headers)
+        return json.loads(response.data.decode()).get('name')
+
+    def test_reads_follow_writes_then_replica(self):
+        response = self.client.post('/bucketlists/', headers=self.headers,
+                                    data=json.dumps({"name": "primary bucket"}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(), "primary bucket")
+
+        self.expire_window()
+        self.assertEqual(self.names(), "replica bucket")
+
+        response = self.client.put('/bucketlists/1', headers=self.headers,
+                                   data=json.dumps({"name": "renamed"}),
+                                   content_type='application/json')
+        self.assertEqual(json.loads(response.data.decode())['name'], "renamed")
+        self.assertEqual(self.names(), "renamed")
+
+    def test_without_replica_reads_use_primary(self):
+        self.app.config['SQLALCHEMY_BINDS'] = None
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "primary bucket"}),
+                         content_type='application/json')
+        self.expire_window()
+        self.assertEqual(self.names(), "primary bucket")
+
+    def test_window_follows_the_client_to_other_workers(self):
+        self.client.post('/bucketlists/', headers=self.headers,
+                         data=json.dumps({"name": "primary bucket"}),
+                         content_type='application/json')
+        # Another worker never saw the write, the cookie still applies
+        replica_router.clear()
+        self.assertEqual(self.names(), "primary bucket")
+
+        cookie = [c for c in self.client.cookie_jar
+                  if c.name == 'replica_sticky'][0]
+        self.client.set_cookie('localhost', 'replica_sticky',
+                               cookie.value[:-1] + 'x')
+        self.assertEqual(self.names(), "replica bucket")
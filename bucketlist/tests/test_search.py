@@ -0,0 +1,75 @@
+import unittest
+
+from flask import json
+
+from bucketlist.tests.base import Initializer
+
+
+class SearchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        login = self.initializer.login()
+        data = json.loads(login.data.decode())
+        self.headers = {
+            "Token": data['auth_token']
+        }
+        self.client = self.initializer.get_app().test_client()
+
+    def create(self, name):
+        response = self.client.post(
+            '/bucketlists/',
+            headers=self.headers,
+            data=json.dumps({"name": name}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data.decode())['id']
+
+    def search(self, term, cursor=None):
+        url = '/bucketlists/?q=' + term
+        if cursor is not None:
+            url += '&cursor=' + cursor
+        response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [bucket['name'] for bucket in
+                json.loads(response.data.decode()).get('bucketlists', [])]
+
+    def test_search_matches_substrings(self):
+        self.create("skydiving")
+        self.create("cooking class")
+        self.assertEqual(self.search("ydiv"), ["skydiving"])
+        self.assertEqual(self.search("ydiv", cursor=''), ["skydiving"])
+        self.assertEqual(self.search("zzz"), [])
+
+    def test_search_results_are_ranked(self):
+        self.create("a weekend trip to paris and then on to rome")
+        self.create("paris")
+        self.assertEqual(
+            self.search("paris"),
+            ["paris", "a weekend trip to paris and then on to rome"])
+
+    def test_cursor_search_is_in_id_order(self):
+        self.create("a weekend trip to paris and then on to rome")
+        self.create("paris")
+        self.assertEqual(
+            self.search("paris", cursor=''),
+            ["a weekend trip to paris and then on to rome", "paris"])
+
+    def test_search_short_terms(self):
+        self.create("go to the moon")
+        self.assertEqual(self.search("mo"), ["go to the moon"])
+        self.assertEqual(self.search("%"), [])
+
+    def test_search_follows_updates_and_deletes(self):
+        bucketlist_id = self.create("learn guitar")
+        self.client.put(
+            '/bucketlists/%d' % bucketlist_id,
+            headers=self.headers,
+            data=json.dumps({"name": "learn piano"}),
+            content_type='application/json')
+        self.assertEqual(self.search("guitar"), [])
+        self.assertEqual(self.search("piano"), ["learn piano"])
+
+        self.client.delete('/bucketlists/%d' % bucketlist_id,
+                           headers=self.headers)
+        self.assertEqual(self.search("piano"), [])
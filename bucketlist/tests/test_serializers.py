@@ -0,0 +1,39 @@
+import datetime
+import unittest
+
+from flask import json
+
+from bucketlist import serializers
+from bucketlist.tests.base import Initializer
+
+
+class SerializerTestCase(unittest.TestCase):
+
+    def test_datetimes_are_iso_8601(self):
+        moment = datetime.datetime(2017, 7, 1, 12, 30, 15)
+        self.assertEqual(serializers.isoformat(moment), '2017-07-01T12:30:15')
+        self.assertIsNone(serializers.isoformat(None))
+
+    def test_backends_agree(self):
+        data = {'name': 'bucket / 1', 'done': False, 'items': [1, None]}
+        outputs = set(backend(data) for backend in serializers.backends.values())
+        self.assertEqual(len(outputs), 1)
+        self.assertEqual(json.loads(outputs.pop().decode()), data)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, serializers.set_backend, 'missing')
+
+    def test_responses_use_iso_dates(self):
+        initializer = Initializer()
+        data = json.loads(initializer.login().data.decode())
+        headers = {
+            "Token": data['auth_token']
+        }
+        client = initializer.get_app().test_client()
+        client.post('/bucketlists/', headers=headers,
+                    data=json.dumps({"name": "bucket 1"}),
+                    content_type='application/json')
+        response = client.get('/bucketlists/1', headers=headers)
+        self.assertEqual(response.content_type, 'application/json')
+        bucket = json.loads(response.data.decode())
+        datetime.datetime.strptime(bucket['date_created'], '%Y-%m-%dT%H:%M:%S')
@@ -0,0 +1,137 @@
+import datetime
+import unittest
+
+from flask import json
+
+from bucketlist.extensions import db
+from bucketlist.models.models import DeletedRecord
+from bucketlist.tests.base import Initializer
+from bucketlist.v1.sync import encode_sync_token
+
+
+class SyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.initializer = Initializer()
+        self.app = self.initializer.get_app()
+        login = self.initializer.login()
+        self.headers = {
+            "Token": json.loads(login.data.decode())['auth_token']
+        }
+        self.client = self.app.test_client()
+        for name in ("bucket 1", "bucket 2"):
+            self.client.post('/bucketlists/', headers=self.headers,
+                             data=json.dumps({"name": name}),
+                             content_type='application/json')
+        for name in ("item 1", "item 2"):
+            self.client.post('/bucketlists/1/items/', headers=self.headers,
+                             data=json.dumps({"name": name, "done": False}),
+                             content_type='application/json')
+
+    def sync(self, since=None):
+        url = '/sync'
+        if since is not None:
+            url += '?since=' + since
+        response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data.decode())
+
+    def age(self, seconds):
+        """Moves every row and tombstone back in time"""
+        with self.app.app_context():
+            shift = "datetime({0}, '-%d seconds')" % seconds
+            for table, column in (('bucketlists', 'date_modified'),
+                                  ('bucketlistitems', 'date_modified'),
+                                  ('deleted_records', 'deleted_at')):
+                db.session.execute('UPDATE %s SET %s = %s' % (
+                    table, column, shift.format(column)))
+            db.session.commit()
+
+    def test_full_sync(self):
+        result = self.sync()
+        self.assertTrue(result['reset'])
+        self.assertEqual(len(result['bucketlists']), 2)
+        self.assertEqual(
+            [(item['name'], item['bucketlist_id']) for item in result['items']],
+            [("item 1", 1), ("item 2", 1)])
+        self.assertEqual(result['deleted'], [])
+        self.assertTrue(result['sync_token'])
+
+    def test_changes_and_tombstones_since_token(self):
+        self.age(60)
+        token = self.sync()['sync_token']
+        self.age(60)
+
+        self.client.put('/bucketlists/1/items/2', headers=self.headers,
+                        data=json.dumps({"done": True}),
+                        content_type='application/json')
+        self.client.delete('/bucketlists/1/items/1', headers=self.headers)
+        self.client.delete('/bucketlists/2', headers=self.headers)
+
+        result = self.sync(token)
+        self.assertFalse(result['reset'])
+        # Its counters changed with the items
+        self.assertEqual(
+            [(bucket['id'], bucket['item_count'], bucket['done_count'])
+             for bucket in result['bucketlists']], [(1, 1, 1)])
+        self.assertEqual([item['id'] for item in result['items']], [2])
+        self.assertTrue(result['items'][0]['done'])
+        self.assertEqual(result['deleted'], [
+            {'kind': 'item', 'id': 1, 'bucketlist_id': 1},
+            {'kind': 'bucketlist', 'id': 2, 'bucketlist_id': 2}])
+
+        # Nothing changed since, apart from the overlap window
+        self.age(60)
+        result = self.sync(result['sync_token'])
+        self.assertEqual(
+            (result['bucketlists'], result['items'], result['deleted']),
+            ([], [], []))
+
+    def test_bulk_delete_records_tombstones(self):
+        self.client.delete('/bucketlists/1/items/?ids=1&ids=2',
+                           headers=self.headers)
+        with self.app.app_context():
+            records = db.session.query(
+                DeletedRecord.kind, DeletedRecord.record_id).order_by(
+                DeletedRecord.id).all()
+        self.assertEqual(records, [('item', 1), ('item', 2)])
+
+    def test_other_users_see_nothing(self):
+        self.client.delete('/bucketlists/2', headers=self.headers)
+        self.headers = self.initializer.login_as('other')
+        result = self.sync()
+        self.assertEqual((result['bucketlists'], result['items']), ([], []))
+        self.client.delete('/bucketlists/1', headers=self.headers)
+        with self.app.app_context():
+            self.assertEqual(DeletedRecord.query.count(), 1)
+
+    def test_expired_token_forces_reset(self):
+        self.age(60)
+        token = encode_sync_token(datetime.datetime(2000, 1, 1))
+        result = self.sync(token)
+        self.assertTrue(result['reset'])
+        self.assertEqual(len(result['bucketlists']), 2)
+
+    def test_invalid_token(self):
+        response = self.client.get('/sync?since=garbage', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data.decode())['message'],
+                         "invalid sync token")
+
+    def test_prune(self):
+        self.client.delete('/bucketlists/2', headers=self.headers)
+        self.age(2 * 86400)
+        self.client.delete('/bucketlists/1/items/1', headers=self.headers)
+        with self.app.app_context():
+            self.assertEqual(DeletedRecord.prune(1), 1)
+            self.assertEqual(DeletedRecord.query.count(), 1)
+
+    def test_deletes_change_last_modified(self):
+        self.age(60)
+        response = self.client.get('/bucketlists/1/items/', headers=self.headers)
+        last_modified = response.headers['Last-Modified']
+        self.client.delete('/bucketlists/1/items/1', headers=self.headers)
+        headers = {'If-Modified-Since': last_modified}
+        headers.update(self.headers)
+        response = self.client.get('/bucketlists/1/items/', headers=headers)
+        self.assertEqual(response.status_code, 200)
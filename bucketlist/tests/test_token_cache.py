@@ -0,0 +1,53 @@
+import time
+import unittest
+
+from flask import json
+
+from bucketlist.extensions import token_cache
+from bucketlist.tests.base import Initializer
+from bucketlist.token_cache import TokenCache
+
+
+class TokenCacheTestCase(unittest.TestCase):
+
+    def test_cache_hits_and_misses(self):
+        cache = TokenCache(max_size=2)
+        self.assertIsNone(cache.get('token'))
+        cache.set('token', 1, time.time() + 60)
+        self.assertEqual(cache.get('token'), 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = TokenCache(max_size=2)
+        cache.set('first', 1, time.time() + 60)
+        cache.set('second', 2, time.time() + 60)
+        cache.get('first')
+        cache.set('third', 3, time.time() + 60)
+        self.assertIsNone(cache.get('second'))
+        self.assertEqual(cache.get('first'), 1)
+        self.assertEqual(cache.get('third'), 3)
+
+    def test_cache_entries_expire_with_token(self):
+        cache = TokenCache()
+        cache.set('token', 1, time.time() - 1)
+        self.assertIsNone(cache.get('token'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_disabled_cache(self):
+        cache = TokenCache(max_size=0)
+        cache.set('token', 1, time.time() + 60)
+        self.assertIsNone(cache.get('token'))
+
+    def test_repeated_requests_hit_cache(self):
+        initializer = Initializer()
+        data = json.loads(initializer.login().data.decode())
+        headers = {
+            "Token": data['auth_token']
+        }
+        client = initializer.get_app().test_client()
+        client.get('/bucketlists/', headers=headers)
+        hits = token_cache.stats()['hits']
+        response = client.get('/bucketlists/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(token_cache.stats()['hits'], hits + 1)
@@ -0,0 +1,42 @@
+from functools import wraps
+
+from flask import request, g
+
+from bucketlist.extensions import replica_router
+from bucketlist.models.models import User
+from bucketlist.serializers import json_response
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def unauthorized():
+    result = {
+        "message": "unauthorized action"
+    }
+    return json_response(result, 401)
+
+
+def login_required(func):
+    """
+    Resolves the user behind the request token once and stores its id on
+    flask.g. Requests without a valid token are rejected here, before any
+    database work is done. Safe requests may read from the replica, other
+    requests keep their user on the primary for a short while.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        access_token = request.headers.get('token')
+        if not access_token:
+            return unauthorized()
+        # Attempt to decode the token and get the User ID
+        user_id = User.decode_auth_token(access_token)
+        if not isinstance(user_id, int):
+            return unauthorized()
+        g.user_id = user_id
+        if request.method in SAFE_METHODS:
+            replica_router.route_reads(user_id)
+            return func(*args, **kwargs)
+        response = func(*args, **kwargs)
+        replica_router.record_write(user_id)
+        return response
+    return wrapper
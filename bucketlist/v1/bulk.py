@@ -0,0 +1,86 @@
+import csv
+import json
+
+from flask import request
+from flask_restplus import inputs
+
+from bucketlist.Exceptions.invalid_query import InvalidQuery
+
+
+def _stream_lines():
+    # The request stream yields raw lines without loading the whole body.
+    for line in request.stream:
+        yield line.decode('utf-8')
+
+
+def _ndjson_rows():
+    for line in _stream_lines():
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def _csv_rows():
+    return csv.DictReader(_stream_lines())
+
+
+def read_bulk_rows(max_rows):
+    """
+    Reads the rows of a bulk request. The body is either a JSON array,
+    newline delimited JSON (application/x-ndjson) or CSV with a header
+    line (text/csv); the latter two are read from the request stream.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        rows = _ndjson_rows()
+    elif request.mimetype == 'text/csv':
+        rows = _csv_rows()
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            raise InvalidQuery("expected a JSON array of rows", 400)
+
+    result = []
+    try:
+        for row in rows:
+            if len(result) == max_rows:
+                raise InvalidQuery(
+                    "at most %d rows can be imported at once" % max_rows, 413)
+            result.append(row)
+    except (UnicodeDecodeError, csv.Error):
+        raise InvalidQuery("malformed request body", 400)
+    return result
+
+
+def validate_rows(rows, max_length, with_done=False):
+    """
+    Validates bulk rows in one pass. Returns a list with a result dict
+    per row, errors already filled in, and the valid rows as a dict of
+    name to (index, done). A name repeated in the payload is a conflict.
+    """
+    results = []
+    valid = {}
+    for index, row in enumerate(rows):
+        result = {'index': index}
+        results.append(result)
+        name = row.get('name') if isinstance(row, dict) else None
+        if not isinstance(name, str) or not name.strip():
+            result.update(status=400, message="name attribute not found!")
+            continue
+        if len(name) > max_length:
+            result.update(status=400, message="name is too long!")
+            continue
+        done = False
+        if with_done and row.get('done') not in (None, ''):
+            try:
+                done = inputs.boolean(row['done'])
+            except (ValueError, AttributeError):
+                result.update(status=400, message="done should be a boolean!")
+                continue
+        if name in valid:
+            result.update(status=409, message="name repeated in request!")
+            continue
+        valid[name] = (index, done)
+    return results, valid
@@ -0,0 +1,90 @@
+import base64
+import binascii
+import json
+
+from flask import request
+from werkzeug.urls import url_encode
+
+from bucketlist.Exceptions.invalid_query import InvalidQuery
+
+NEXT = 'next'
+PREVIOUS = 'prev'
+
+
+def encode_cursor(direction, key):
+    """
+    Packs a page direction and the key of the boundary row into an
+    opaque url safe cursor
+    """
+    raw = json.dumps([direction, key]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Unpacks a cursor made by encode_cursor. An empty cursor stands for
+    the first page.
+    """
+    if not cursor:
+        return None, None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, key = json.loads(
+            base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise InvalidQuery("invalid cursor", 400)
+    if direction not in (NEXT, PREVIOUS) or not isinstance(key, int):
+        raise InvalidQuery("invalid cursor", 400)
+    return direction, key
+
+
+def keyset_page(query, column, cursor, limit):
+    """
+    Fetches one page of query ordered by column, starting after or before
+    the row the cursor points at. Any ordering already on query, such
+    as a search rank, is replaced. No OFFSET or COUNT query is issued; one extra row is fetched
+    to tell whether the page has a successor.
+
+    Returns the rows of the page with the next and previous cursors,
+    either of which is None at the ends of the result set.
+    """
+    direction, key = decode_cursor(cursor)
+    query = query.order_by(None)
+    if direction == PREVIOUS:
+        rows = query.filter(column < key).order_by(
+            column.desc()).limit(limit + 1).all()
+        has_previous = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+        has_next = True
+    else:
+        if direction == NEXT:
+            query = query.filter(column > key)
+        rows = query.order_by(column).limit(limit + 1).all()
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        has_previous = direction == NEXT
+
+    next_cursor = None
+    previous_cursor = None
+    if rows:
+        if has_next:
+            next_cursor = encode_cursor(NEXT, getattr(rows[-1], column.key))
+        if has_previous:
+            previous_cursor = encode_cursor(
+                PREVIOUS, getattr(rows[0], column.key))
+    return rows, next_cursor, previous_cursor
+
+
+def page_links(next_cursor, previous_cursor):
+    """
+    Builds an RFC 5988 Link header value pointing at the neighbouring
+    pages of the current request
+    """
+    links = []
+    for rel, cursor in (('next', next_cursor), ('prev', previous_cursor)):
+        if cursor is not None:
+            args = request.args.to_dict()
+            args['cursor'] = cursor
+            links.append('<%s?%s>; rel="%s"' % (
+                request.base_url, url_encode(args), rel))
+    return ', '.join(links)
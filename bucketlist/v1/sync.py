@@ -0,0 +1,79 @@
+import base64
+import binascii
+import datetime
+import json
+
+from flask import current_app
+
+from bucketlist.Exceptions.invalid_query import InvalidQuery
+from bucketlist.extensions import db
+from bucketlist.models.models import Bucketlist, Bucketlistitem, DeletedRecord
+from bucketlist.serializers import serialize_bucketlist, serialize_item
+
+TOKEN_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def encode_sync_token(moment):
+    """
+    Packs the database time a sync ran at into an opaque url safe token
+    """
+    raw = json.dumps([moment.strftime(TOKEN_FORMAT)]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_sync_token(token):
+    """
+    Unpacks a token made by encode_sync_token. An empty token asks for a
+    full sync.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        moment, = json.loads(
+            base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return datetime.datetime.strptime(moment, TOKEN_FORMAT)
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise InvalidQuery("invalid sync token", 400)
+
+
+def changes_since(user_id, token=None):
+    """
+    Collects what changed for user_id since the sync that returned token.
+
+    Rows modified within SYNC_OVERLAP_SECONDS before that sync are sent
+    again, so writes that committed late are not lost; clients apply the
+    tombstones first and then upsert the rows. Without a token, or with
+    one older than the tombstone retention, everything is sent with reset
+    set and the client replaces its copy.
+    """
+    since = decode_sync_token(token)
+    now = db.session.query(db.func.current_timestamp()).scalar()
+    retention = datetime.timedelta(
+        days=current_app.config.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+    if since is not None and since < now - retention:
+        since = None
+    if since is not None:
+        since -= datetime.timedelta(
+            seconds=current_app.config.get('SYNC_OVERLAP_SECONDS', 5))
+
+    items = []
+    for item in Bucketlistitem.changed_since(user_id, since):
+        result = serialize_item(item)
+        result['bucketlist_id'] = item.bucketlist_id
+        items.append(result)
+    deleted = []
+    if since is not None:
+        deleted = [{
+            'kind': record.kind,
+            'id': record.record_id,
+            'bucketlist_id': record.bucketlist_id
+        } for record in DeletedRecord.since(user_id, since)]
+    return {
+        'bucketlists': [serialize_bucketlist(bucket) for bucket in
+                        Bucketlist.changed_since(user_id, since)],
+        'items': items,
+        'deleted': deleted,
+        'reset': since is None,
+        'sync_token': encode_sync_token(now)
+    }
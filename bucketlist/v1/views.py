@@ -1,11 +1,24 @@
+import hashlib
 import re
+import zlib
 
-from flask import request, make_response, jsonify, Blueprint
-from flask_restplus import Resource, Api, fields, reqparse
+from flask import request, Blueprint, Response, current_app, g, \
+    stream_with_context
+from flask_restplus import Resource, Api, fields, inputs, reqparse
 from validate_email import validate_email
 
 from bucketlist.Exceptions.invalid_query import InvalidQuery
-from bucketlist.models.models import User, Bucketlist, Bucketlistitem
+from bucketlist.Exceptions.pool_saturated import PoolSaturated
+from bucketlist.events import stream_events
+from bucketlist.extensions import db, event_broker, metrics, response_cache
+from bucketlist.models.models import User, Bucketlist, Bucketlistitem, RefreshToken
+from bucketlist.search import search_bucketlists
+from bucketlist.serializers import (
+    dumps, json_response, serialize_bucketlist, serialize_item, serialize_user)
+from bucketlist.v1.auth import login_required
+from bucketlist.v1.bulk import read_bulk_rows, validate_rows
+from bucketlist.v1.pagination import keyset_page, page_links
+from bucketlist.v1.sync import changes_since
 
 v1 = Blueprint('v1', __name__)
 
@@ -34,6 +47,13 @@ register_expect_fields = api.model('Registration', {
 ns = api.namespace('/', description='Operations related to a bucket list')
 
 
+@api.errorhandler(PoolSaturated)
+def handle_pool_saturated(error):
+    """Ask clients to back off while the password hashing pool is full"""
+    return error.to_dict(), error.status_code, {
+        'Retry-After': str(error.retry_after)}
+
+
 @ns.route('/auth/register')
 class Register(Resource):
 
@@ -56,13 +76,9 @@ class Register(Resource):
             if isinstance(user, User):
                 result = {
                     'message': "user registered successfully",
-                    'user': {
-                        'user_id': user.id,
-                        'username': user.username,
-                        'email': user.email
-                    }
+                    'user': serialize_user(user)
                 }
-                return make_response(jsonify(result), 201)
+                return json_response(result, 201)
             else:
                 return user
         else:
@@ -108,23 +124,80 @@ class Login(Resource):
                 # authorization header
                 access_token = user.encode_auth_token(user.id)
                 if access_token:
+                    refresh_token = RefreshToken.encode_refresh_token(user.id)
                     result = {
                         "username": user.username,
                         "email": user.email,
-                        "auth_token": access_token.decode()
+                        "auth_token": access_token.decode(),
+                        "refresh_token": refresh_token.decode()
                     }
-                    return make_response(jsonify(result), 200)
+                    return json_response(result, 200)
             else:
                 result = {
                     'message': "Invalid email or password, Please try again",
                 }
-                return make_response(jsonify(result), 401)
+                return json_response(result, 401)
 
         except InvalidQuery:
             result = {
                 'message': "Query error!",
             }
-            return make_response(jsonify(result), 500)
+            return json_response(result, 500)
+
+
+refresh_expect_fields = api.model('Refresh', {
+    'refresh_token': fields.String(required=True, description='refresh token'),
+})
+
+
+def get_refresh_token():
+    try:
+        return request.json.get('refresh_token')
+    except AttributeError:
+        return None
+
+
+@ns.route('/auth/refresh')
+class Refresh(Resource):
+    """
+    exchange a refresh token for a new access token
+    """
+    @api.expect(refresh_expect_fields)
+    def post(self):
+        """
+        get a new access token
+
+        """
+        token = get_refresh_token()
+        if not token:
+            return "refresh token not found", 400
+
+        access_token = RefreshToken.refresh_access_token(token)
+        if isinstance(access_token, bytes):
+            result = {
+                "auth_token": access_token.decode()
+            }
+            return json_response(result, 200)
+        result = {
+            'message': access_token,
+        }
+        return json_response(result, 401)
+
+    @api.expect(refresh_expect_fields)
+    def delete(self):
+        """
+        revoke a refresh token
+
+        """
+        token = get_refresh_token()
+        if not token:
+            return "refresh token not found", 400
+
+        message, status = RefreshToken.revoke_refresh_token(token)
+        result = {
+            'message': message,
+        }
+        return json_response(result, status)
 
 
 pagination_arguments = reqparse.RequestParser()
@@ -141,6 +214,96 @@ pagination_arguments.add_argument(
     required=False,
     default=20)
 pagination_arguments.add_argument('q', location="args", required=False)
+pagination_arguments.add_argument(
+    'cursor',
+    location="args",
+    required=False,
+    help='Opaque keyset cursor. Pass an empty value for the first page. '
+         'Pages come in id order, q filters them without ranking.')
+
+
+item_arguments = reqparse.RequestParser()
+item_arguments.add_argument(
+    'limit',
+    location="args",
+    type=int,
+    required=False,
+    default=100)
+item_arguments.add_argument(
+    'cursor',
+    location="args",
+    required=False,
+    help='Opaque keyset cursor taken from the Link header.')
+item_arguments.add_argument(
+    'done',
+    location="args",
+    type=inputs.boolean,
+    required=False)
+
+
+def bucketlists_with_items(bucketlists):
+    """
+    Builds the response dicts for a page of bucketlists, loading the items
+    of the whole page in a single query. At most ITEMS_EMBED_LIMIT items
+    are embedded per bucketlist, items_url points at the full list.
+    """
+    embed_limit = current_app.config.get('ITEMS_EMBED_LIMIT', 20)
+    grouped = Bucketlistitem.get_items_for_bucketlists(
+        [bucket.id for bucket in bucketlists], embed_limit + 1)
+    result = []
+    for bucket in bucketlists:
+        items = grouped[bucket.id]
+        a_bucket = serialize_bucketlist(bucket, items[:embed_limit])
+        a_bucket['items_truncated'] = len(items) > embed_limit
+        a_bucket['items_url'] = str(request.url_root) + \
+            'bucketlists/' + str(bucket.id) + '/items/'
+        result.append(a_bucket)
+    return result
+
+
+def cached_json(key, build):
+    """
+    Serves the body cached under key, or calls build and caches the
+    response it returns when it succeeded
+    """
+    body = response_cache.get(key)
+    if body is not None:
+        return Response(body, status=200, mimetype='application/json')
+    response = build()
+    if response.status_code == 200:
+        response_cache.set(key, response.get_data())
+    return response
+
+
+def conditional_response(freshness, build):
+    """
+    Answers 304 Not Modified when the client's If-None-Match, or else its
+    If-Modified-Since, still matches freshness, so the payload is never
+    built. Otherwise returns build() with ETag and Last-Modified set.
+    When the probe found no rows at all the response is always built.
+    """
+    etag = hashlib.sha1(('%s|%s|%s' % (
+        g.user_id, request.full_path, freshness.token)).encode('utf-8')).hexdigest()
+    last_modified = freshness.last_modified
+    if last_modified is None:
+        not_modified = False
+    elif request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = (
+            request.if_modified_since is not None and
+            last_modified.replace(microsecond=0) <= request.if_modified_since)
+    if not_modified:
+        response = Response(status=304)
+    else:
+        response = build()
+        if not isinstance(response, Response) or response.status_code != 200:
+            return response
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
 
 bucketlist_expect = api.model('Bucketlist_expect', {
     'name': fields.String(description='Bucketlist name', required=True),
@@ -154,6 +317,7 @@ class Bucketlists(Resource):
     """
     Shows a list of all bucketlists, and lets you POST to add new bucketlists
     """
+    method_decorators = [login_required]
 
     @api.header('Token', required=True)
     @api.expect(pagination_arguments)
@@ -161,157 +325,87 @@ class Bucketlists(Resource):
         """
         List all bucket list
         """
+        freshness = Bucketlist.freshness(g.user_id)
+        return conditional_response(
+            freshness, lambda: self.listing(freshness))
 
+    def listing(self, freshness):
         args = pagination_arguments.parse_args()
         page = args['page']
-        limit = args['limit']
+        limit = min(max(args['limit'], 1), 100)
         search_words = args['q']
 
-        if limit > 100:
-            limit = 100
-
-        access_token = request.headers.get('token')
-        if not access_token:
-            result = {
-                "message": "unauthorized action"
-            }
-            return make_response(jsonify(result), 401)
+        user_id = g.user_id
+        if args['cursor'] is not None:
+            query = Bucketlist.read_query().filter(
+                Bucketlist.created_by == user_id)
+            if search_words:
+                # Keyset pages follow the id, search only filters them
+                query = search_bucketlists(query, search_words)
+            try:
+                bucketlists, next_cursor, previous_cursor = keyset_page(
+                    query, Bucketlist.id, args['cursor'], limit)
+            except InvalidQuery as error:
+                return json_response(error.to_dict(), error.status_code)
+            result = {'bucketlists': bucketlists_with_items(bucketlists),
+                      'has_next': next_cursor is not None,
+                      'previous_cursor': previous_cursor,
+                      'next_cursor': next_cursor
+                      }
+            return json_response(result, 200)
+
+        if page == 1 and response_cache.enabled:
+            return cached_json(
+                response_cache.list_key(user_id, freshness.token),
+                lambda: self.render_page(user_id, page, limit, search_words))
+        return self.render_page(user_id, page, limit, search_words)
 
+    @staticmethod
+    def render_page(user_id, page, limit, search_words):
+        """
+        Builds one numbered page of the bucketlists of user_id
+        """
+        query = Bucketlist.read_query().filter(
+            Bucketlist.created_by == user_id)
+        if search_words:
+            query = search_bucketlists(query, search_words)
+            page_url = 'q=' + str(search_words)
         else:
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-            if isinstance(user_id, int):
-                if search_words:
-                    bucketlists_page = Bucketlist.query.filter(
-                        Bucketlist.created_by == user_id,
-                        Bucketlist.name.contains(
-                            search_words +
-                            "%")).paginate(
-                        page,
-                        limit,
-                        False)
-                    if bucketlists_page:
-                        total = bucketlists_page.pages
-                        has_next = bucketlists_page.has_next
-                        has_previous = bucketlists_page.has_prev
-
-                        if has_next:
-                            next_page = str(request.url_root) + 'bucketlists?' + \
-                                'q=' + str(search_words) + '&page=' + str(page + 1)
-                        else:
-                            next_page = 'None'
-                        if has_previous:
-                            previous_page = request.url_root + 'bucketlists?' + \
-                                'q=' + str(search_words) + '&page=' + str(page - 1)
-                        else:
-                            previous_page = 'None'
-                        bucketlists = bucketlists_page.items
-                        if bucketlists:
-                            items = []
-                            for item in bucketlists:
-                                buc_items = []
-                                bucketlist_items = Bucketlistitem.query.filter_by(
-                                    bucketlist_id=item.id).all()
-                                for any_item in bucketlist_items:
-                                    an_item = {
-                                        'id': any_item.id,
-                                        'name': any_item.name,
-                                        'done': any_item.done,
-                                        'date_created': any_item.date_created,
-                                        'date_modified': any_item.date_modified
-                                    }
-                                    buc_items.append(an_item)
-                                a_bucket = {
-                                    'id': item.id,
-                                    'name': item.name,
-                                    'items': buc_items,
-                                    'created_by': item.created_by,
-                                    'date_created': item.date_created,
-                                    'date_modified': item.date_modified
-                                }
-                                items.append(a_bucket)
-
-                            result = {'bucketlists': items,
-                                      'has_next': has_next,
-                                      'pages': total,
-                                      'previous_page': previous_page,
-                                      'next_page': next_page
-                                      }
-                            return make_response(jsonify(result), 200)
-                        else:
-                            result = {
-                                "message": "No bucketlist item  found"
-                            }
-                            return make_response(jsonify(result), 200)
-
-                bucketlists_page = Bucketlist.query.filter_by(
-                    created_by=user_id).paginate(
-                    page=page, per_page=limit, error_out=False)
-                if not bucketlists_page:
-                    result = {
-                        "message": "No bucketlist item  found"
-                    }
-                    return make_response(jsonify(result), 204)
-
-                total = bucketlists_page.pages
-                has_next = bucketlists_page.has_next
-                has_previous = bucketlists_page.has_prev
-
-                if has_next:
-                    next_page = str(request.url_root) + 'bucketlists?' + \
-                        'limit=' + str(limit) + '&page=' + str(page + 1)
-                else:
-                    next_page = 'None'
-                if has_previous:
-                    previous_page = request.url_root + 'bucketlists?' + \
-                        'limit=' + str(limit) + '&page=' + str(page - 1)
-                else:
-                    previous_page = 'None'
-
-                bucketlists = bucketlists_page.items
-                items = []
-                if bucketlists:
-                    for item in bucketlists:
-                        buc_items = []
-                        bucketlist_items = Bucketlistitem.query.filter_by(
-                            bucketlist_id=item.id).all()
-                        for any_item in bucketlist_items:
-                            an_item = {
-                                'id': any_item.id,
-                                'name': any_item.name,
-                                'done': any_item.done,
-                                'date_created': any_item.date_created,
-                                'date_modified': any_item.date_modified
-                            }
-                            buc_items.append(an_item)
-                        a_bucket = {
-                            'id': item.id,
-                            'name': item.name,
-                            'items': buc_items,
-                            'created_by': item.created_by,
-                            'date_created': item.date_created,
-                            'date_modified': item.date_modified
-                        }
-                        items.append(a_bucket)
-
-                    result = {'bucketlists': items,
-                              'has_next': has_next,
-                              'pages': total,
-                              'previous_page': previous_page,
-                              'next_page': next_page
-                              }
-                    return make_response(jsonify(result), 200)
-                else:
-                    result = {
-                        "message": "No bucketlist item  found"
-                    }
-                    return make_response(jsonify(result), 200)
+            page_url = 'limit=' + str(limit)
+        bucketlists_page = query.order_by(Bucketlist.id).paginate(
+            page=page, per_page=limit, error_out=False)
 
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+        total = bucketlists_page.pages
+        has_next = bucketlists_page.has_next
+        has_previous = bucketlists_page.has_prev
+
+        if has_next:
+            next_page = str(request.url_root) + 'bucketlists?' + \
+                page_url + '&page=' + str(page + 1)
+        else:
+            next_page = 'None'
+        if has_previous:
+            previous_page = request.url_root + 'bucketlists?' + \
+                page_url + '&page=' + str(page - 1)
+        else:
+            previous_page = 'None'
+
+        bucketlists = bucketlists_page.items
+        if bucketlists:
+            items = bucketlists_with_items(bucketlists)
+
+            result = {'bucketlists': items,
+                      'has_next': has_next,
+                      'pages': total,
+                      'previous_page': previous_page,
+                      'next_page': next_page
+                      }
+            return json_response(result, 200)
+        else:
+            result = {
+                "message": "No bucketlist item  found"
+            }
+            return json_response(result, 200)
 
     @api.header('Token', required=True)
     @api.expect(bucketlist_expect)
@@ -319,7 +413,6 @@ class Bucketlists(Resource):
         """
                insert a bucket list
                """
-        access_token = request.headers.get('token')
         try:
             name = request.json.get('name')
             if not name:
@@ -328,92 +421,161 @@ class Bucketlists(Resource):
         except AttributeError:
             return "attribute name not found", 400
 
-        if not access_token:
-            result = {
-                "message": "unauthorized action"
-            }
-            return make_response(jsonify(result), 401)
-        if access_token:
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-
-            if isinstance(user_id, int):
-                output = Bucketlist.create_bucketlist(user_id, name)
-                if isinstance(output, Bucketlist):
-                    result = {
-                        "id": output.id,
-                        "name": output.name,
-                        "created_by": output.created_by,
-                        "date_created": output.date_created
-                    }
+        output = Bucketlist.create_bucketlist(g.user_id, name)
+        if isinstance(output, Bucketlist):
+            result = serialize_bucketlist(output)
+
+            return json_response(result, 200)
+        else:
+            return output
 
-                    return make_response(jsonify(result), 200)
-                else:
-                    return output
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+
+export_arguments = reqparse.RequestParser()
+export_arguments.add_argument(
+    'gzip',
+    location="args",
+    type=inputs.boolean,
+    required=False,
+    default=False)
+
+
+def gzip_chunks(chunks):
+    """
+    Compresses a stream of byte chunks into a single gzip stream
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@ns.route('/bucketlists/export')
+class BucketlistExport(Resource):
+    """
+    Streams all bucketlists of the user as newline delimited JSON
+    """
+    method_decorators = [login_required]
+
+    @api.header('Token', required=True)
+    @api.expect(export_arguments)
+    def get(self):
+        """
+        Export all bucketlists with their items, one bucketlist per line
+        """
+        args = export_arguments.parse_args()
+        user_id = g.user_id
+
+        def generate():
+            for bucket, items in Bucketlist.export(user_id):
+                yield dumps(serialize_bucketlist(bucket, items)) + b'\n'
+
+        body = stream_with_context(generate())
+        headers = {
+            'Content-Disposition': 'attachment; filename=bucketlists.ndjson'
+        }
+        if args['gzip']:
+            body = gzip_chunks(body)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(
+            body, mimetype='application/x-ndjson', headers=headers)
+
+
+@ns.route('/bucketlists/stream')
+class BucketlistStream(Resource):
+    """
+    Pushes the user's bucketlist and item changes as Server-Sent Events
+    """
+    method_decorators = [login_required]
+
+    @api.header('Token', required=True)
+    def get(self):
+        """
+        Stream change events, e.g. to know when to call /sync
+        """
+        # The stream never touches the database, give the connection back
+        db.session.remove()
+        headers = {
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+        return Response(
+            stream_events(event_broker, g.user_id),
+            mimetype='text/event-stream', headers=headers)
+
+
+def bulk_response(results, valid, created, taken_message):
+    """
+    Completes the per row results of a bulk import with the ids of the
+    created rows and conflicts for names that were already taken
+    """
+    for name, (index, _) in valid.items():
+        if name in created:
+            results[index].update(status=201, id=created[name])
+        else:
+            results[index].update(status=409, message=taken_message)
+    result = {
+        'created': len(created),
+        'results': results
+    }
+    return json_response(result, 200)
+
+
+@ns.route('/bucketlists/bulk')
+class BucketlistBulk(Resource):
+    method_decorators = [login_required]
+
+    @api.header('Token', required=True)
+    def post(self):
+        """
+        Create many bucketlists from a JSON array, NDJSON or CSV rows
+        """
+        try:
+            rows = read_bulk_rows(current_app.config.get('BULK_MAX_ROWS', 5000))
+        except InvalidQuery as error:
+            return json_response(error.to_dict(), error.status_code)
+
+        results, valid = validate_rows(rows, 50)
+        created = Bucketlist.bulk_create_bucketlists(g.user_id, valid)
+        return bulk_response(
+            results, valid, created, "Bucketlist name already taken!")
 
 
 @ns.route('/bucketlists/<int:id>')
 class BucketlistModification(Resource):
+    method_decorators = [login_required]
+
     @api.header('Token', required=True)
     def get(self, id):
         """
         List all tasks'
         """
+        freshness = Bucketlist.freshness(g.user_id, id)
+        return conditional_response(
+            freshness, lambda: self.cached(id, freshness))
 
-        access_token = request.headers.get('token')
-        if not access_token:
+    def cached(self, id, freshness):
+        if response_cache.enabled:
+            return cached_json(
+                response_cache.detail_key(g.user_id, id, freshness.token),
+                lambda: self.render(id))
+        return self.render(id)
+
+    @staticmethod
+    def render(id):
+        bucket = Bucketlist.read_query().filter(
+            Bucketlist.id == id, Bucketlist.created_by == g.user_id).first()
+
+        if bucket:
+            result = bucketlists_with_items([bucket])[0]
+
+            return json_response(result, 200)
+        else:
             result = {
-                "message": "unauthorized action"
+                "message": "Bucketlist not found"
             }
-            return make_response(jsonify(result), 401)
-
-        if access_token:
-
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-            if isinstance(user_id, int):
-
-                bucket = Bucketlist.query.filter_by(
-                    id=id, created_by=user_id).first()
-
-                if bucket:
-                    bucket_list = []
-                    items = Bucketlistitem.query.filter_by(
-                        bucketlist_id=id).all()
-                    for item in items:
-                        an_item = {
-                            "id": item.id,
-                            "name": item.name,
-                            "date_created": item.date_created,
-                            "done": item.done,
-                            "date_modified": item.date_modified
-                        }
-                        bucket_list.append(an_item)
-                    result = {
-                        "id": bucket.id,
-                        "name": bucket.name,
-                        "items": bucket_list,
-                        "date_created": bucket.date_created,
-                        "date_modified": bucket.date_modified,
-                        "created_by": bucket.created_by
-                    }
-
-                    return make_response(jsonify(result), 200)
-                else:
-                    result = {
-                        "message": "Bucketlist not found"
-                    }
-                    return make_response(jsonify(result), 404)
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+            return json_response(result, 404)
 
     @api.expect(bucketlist_expect)
     @api.header('Token', required=True)
@@ -425,60 +587,20 @@ class BucketlistModification(Resource):
             name = request.json.get('name')
         except AttributeError:
             return "attribute name not found", 400
-        access_token = request.headers.get('token')
-        if not access_token:
-            result = {
-                "message": "unauthorized action"
-            }
-            return make_response(jsonify(result), 401)
-
-        if access_token:
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-            if isinstance(user_id, int):
-                output = Bucketlist.update_bucketlist(id, user_id, name)
-                if isinstance(output, Bucketlist):
-                    result = {
-                        "id": output.id,
-                        "name": output.name,
-                        "created_by": output.created_by,
-                        "date_created": output.date_created
-                    }
-
-                    return make_response(jsonify(result), 200)
-
-                else:
-                    return output
 
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+        output = Bucketlist.update_bucketlist(id, g.user_id, name)
+        if isinstance(output, tuple):
+            return output
+        result = serialize_bucketlist(output)
+        return json_response(result, 200)
 
     @api.header('Token', required=True)
     def delete(self, id):
         """"
         deletes a bucket list given its id
         """
-        access_token = request.headers.get('token')
-        if not access_token:
-            result = {
-                "message": "unauthorized action"
-            }
-            return make_response(jsonify(result), 401)
-
-        if access_token:
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-            if isinstance(user_id, int):
-                output = Bucketlist.delete_bucketlist(id)
-                return output
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+        output = Bucketlist.delete_bucketlist(id, g.user_id)
+        return output
 
 
 bucketlistitem_expect = api.model(
@@ -488,59 +610,109 @@ bucketlistitem_expect = api.model(
                 description='bucket list name', required=True, default=False), })
 
 
+bulk_update_expect = api.model('Bucketlistitem_bulk_update', {
+    'ids': fields.List(fields.Integer, description='ids of the items to mark'),
+    'all': fields.Boolean(description='mark every item of the bucketlist'),
+    'done': fields.Boolean(description='new done state'),
+    'names': fields.Raw(description='map of item ids to new names'),
+})
+
+bulk_delete_arguments = reqparse.RequestParser()
+bulk_delete_arguments.add_argument(
+    'done',
+    location="args",
+    type=inputs.boolean,
+    required=False)
+bulk_delete_arguments.add_argument(
+    'ids',
+    location="args",
+    type=int,
+    action='append',
+    required=False)
+
+
+def parse_item_ids(item_ids):
+    if not isinstance(item_ids, list) or not all(
+            isinstance(item_id, int) and not isinstance(item_id, bool)
+            for item_id in item_ids):
+        return None
+    return item_ids
+
+
+def parse_item_names(names):
+    if not isinstance(names, dict) or not names:
+        return None
+    parsed = {}
+    for item_id, name in names.items():
+        if not str(item_id).isdigit() or not isinstance(name, str) or \
+                not name.strip() or len(name) > 100:
+            return None
+        parsed[int(item_id)] = name
+    return parsed
+
+
+def affected_response(id, affected):
+    """
+    Reports the rows a set based statement touched. The ownership of the
+    bucketlist is only looked up when nothing matched.
+    """
+    if not affected and not Bucketlist.query.filter_by(
+            id=id, created_by=g.user_id).first():
+        return "Bucketlist not found!", 404
+    result = {
+        "affected": affected
+    }
+    return json_response(result, 200)
+
+
 @ns.route('/bucketlists/<int:id>/items/')
 @api.doc(params={})
 class Bucketlistitems(Resource):
     """
     Shows a list of all bucketlists, and lets you POST to add new bucketlists
     """
+    method_decorators = [login_required]
+
     @api.header('Token', required=True)
+    @api.expect(item_arguments)
     def get(self, id):
         """
             List all items of a given bucketlist
         """
-        bucket = Bucketlist.query.filter_by(id=id).first()
-        if not bucket:
+        return conditional_response(
+            Bucketlist.freshness(g.user_id, id), lambda: self.listing(id))
+
+    @staticmethod
+    def listing(id):
+        args = item_arguments.parse_args()
+        limit = min(max(args['limit'], 1), 1000)
+
+        query = Bucketlistitem.read_query().filter(
+            Bucketlistitem.owned_by(id, g.user_id))
+        if args['done'] is not None:
+            query = query.filter(Bucketlistitem.done == args['done'])
+        try:
+            items, next_cursor, previous_cursor = keyset_page(
+                query, Bucketlistitem.id, args['cursor'], limit)
+        except InvalidQuery as error:
+            return json_response(error.to_dict(), error.status_code)
+
+        if items:
+            bucket_item_list = [serialize_item(item) for item in items]
+            headers = {}
+            links = page_links(next_cursor, previous_cursor)
+            if links:
+                headers['Link'] = links
+
+            return json_response(bucket_item_list, 200, headers)
+        elif not Bucketlist.query.filter_by(
+                id=id, created_by=g.user_id).first():
             return "Bucketlist not found!", 404
-        access_token = request.headers.get('token')
-        if not access_token:
+        else:
             result = {
-                "message": "unauthorized action"
+                "message": "No items found"
             }
-            return make_response(jsonify(result), 401)
-
-        if access_token:
-
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-            if isinstance(user_id, int):
-
-                items = Bucketlistitem.query.filter_by(bucketlist_id=id).all()
-
-                if items:
-                    bucket_item_list = []
-                    for item in items:
-                        result = {
-                            "id": item.id,
-                            "name": item.name,
-                            "done": item.done,
-                            "date_created": item.date_created,
-                            "date_modified": item.date_modified
-
-                        }
-                        bucket_item_list.append(result)
-
-                    return make_response(jsonify(bucket_item_list), 200)
-                else:
-                    result = {
-                        "message": "No items found"
-                    }
-                    return make_response(jsonify(result), 200)
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+            return json_response(result, 200)
 
     @api.header('Token', required=True)
     @api.expect(bucketlistitem_expect)
@@ -548,17 +720,6 @@ class Bucketlistitems(Resource):
         """
         creates a bucketlist item
         """
-        access_token = request.headers.get('token')
-
-        bucket = Bucketlist.query.filter_by(id=id).first()
-        if not bucket:
-            return "Bucketlist not found!", 404
-
-        if not access_token:
-            result = {
-                "message": "unauthorized action"
-            }
-            return make_response(jsonify(result), 401)
         try:
             name = request.json.get('name')
             if not name:
@@ -568,33 +729,91 @@ class Bucketlistitems(Resource):
                 return "done attribute not found!", 400
         except AttributeError:
             return "attributes not found!", 400
+        if not isinstance(done, bool):
+            return "done should be a boolean!", 400
 
-        if access_token:
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-            if isinstance(user_id, int):
-                output = Bucketlistitem.create_bucketlistitem(id, name, done)
-                if isinstance(output, Bucketlistitem):
-                    result = {
-                        "id": output.id,
-                        "name": output.name,
-                        "done": output.done,
-                        "date_created": output.date_created
-                    }
+        output = Bucketlistitem.create_bucketlistitem(id, g.user_id, name, done)
+        if isinstance(output, tuple):
+            return output
+        result = serialize_item(output)
+        return json_response(result, 200)
 
-                    return make_response(jsonify(result), 200)
-                else:
-                    return output
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+    @api.header('Token', required=True)
+    @api.expect(bulk_update_expect)
+    def patch(self, id):
+        """
+        mark many items done or undone, or rename many items at once
+        """
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return "attributes not found!", 400
+        done = data.get('done')
+        names = data.get('names')
+        if (done is None) == (names is None):
+            return "send either done or names!", 400
+
+        if names is not None:
+            names = parse_item_names(names)
+            if names is None:
+                return "names should map item ids to names!", 400
+            affected = Bucketlistitem.rename_bucketlistitems(
+                id, g.user_id, names)
+            if isinstance(affected, tuple):
+                return affected
+        else:
+            if not isinstance(done, bool):
+                return "done should be a boolean!", 400
+            item_ids = None
+            if not data.get('all'):
+                item_ids = parse_item_ids(data.get('ids'))
+                if item_ids is None:
+                    return "send a list of ids or all!", 400
+            affected = Bucketlistitem.mark_bucketlistitems(
+                id, g.user_id, done, item_ids)
+        return affected_response(id, affected)
+
+    @api.header('Token', required=True)
+    @api.expect(bulk_delete_arguments)
+    def delete(self, id):
+        """
+        delete many items, e.g. all completed ones, at once
+        """
+        args = bulk_delete_arguments.parse_args()
+        if args['done'] is None and args['ids'] is None:
+            return "send done or ids to select the items to delete!", 400
+        affected = Bucketlistitem.delete_bucketlistitems(
+            id, g.user_id, args['done'], args['ids'])
+        return affected_response(id, affected)
+
+
+@ns.route('/bucketlists/<int:id>/items/bulk')
+@api.doc(params={})
+class BucketlistitemBulk(Resource):
+    method_decorators = [login_required]
+
+    @api.header('Token', required=True)
+    def post(self, id):
+        """
+        Create many items of a bucketlist from a JSON array, NDJSON or CSV rows
+        """
+        bucket = Bucketlist.query.filter_by(id=id, created_by=g.user_id).first()
+        if not bucket:
+            return "Bucketlist not found!", 404
+        try:
+            rows = read_bulk_rows(current_app.config.get('BULK_MAX_ROWS', 5000))
+        except InvalidQuery as error:
+            return json_response(error.to_dict(), error.status_code)
+
+        results, valid = validate_rows(rows, 100, with_done=True)
+        created = Bucketlistitem.bulk_create_bucketlistitems(
+            id, g.user_id, dict((name, done) for name, (_, done) in valid.items()))
+        return bulk_response(results, valid, created, "Item name already taken!")
 
 
 @ns.route('/bucketlists/<int:id>/items/<int:item_id>')
 @api.doc(params={})
 class BucketlistitemModification(Resource):
+    method_decorators = [login_required]
 
     @api.header('Token', required=True)
     @api.expect(bucketlistitem_expect)
@@ -602,69 +821,65 @@ class BucketlistitemModification(Resource):
         """
         updates a bucket list given id and the data
         """
-        access_token = request.headers.get('token')
         try:
             name = request.json.get('name')
             done = request.json.get('done')
         except AttributeError:
             return "attributes not found!"
+        if done is not None and not isinstance(done, bool):
+            return "done should be a boolean!", 400
 
-        if access_token:
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-            buckets = Bucketlist.query.filter_by(id=id).first()
-            if isinstance(user_id, int):
-                if buckets:
-                    output = Bucketlistitem.update_bucketlistitem(
-                        item_id, id, name, done)
-                    if isinstance(output, Bucketlistitem):
-                        result = {
-                            "id": output.id,
-                            "name": output.name,
-                            "done": output.done,
-                            "date_created": output.date_created
-                        }
-                        return make_response(jsonify(result), 200)
-                    else:
-                        return output
-                else:
-                    result = {
-                        "message": "bucketlist not available"
-                    }
-                    return make_response(jsonify(result), 404)
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+        output = Bucketlistitem.update_bucketlistitem(
+            item_id, id, g.user_id, name, done)
+        if isinstance(output, tuple):
+            return output
+        result = serialize_item(output)
+        return json_response(result, 200)
 
     @api.header('Token', required=True)
     def delete(self, id, item_id):
         """"
         deletes a bucket list item given its id
         """
-        access_token = request.headers.get('token')
-        if not access_token:
-            result = {
-                "message": "unauthorized action"
-            }
-            return make_response(jsonify(result), 401)
-
-        if access_token:
-            # Attempt to decode the token and get the User ID
-            user_id = User.decode_auth_token(access_token)
-            buckets = Bucketlist.query.filter_by(id=id).first()
-            if isinstance(user_id, int):
-                if buckets:
-                    output = Bucketlistitem.delete_bucketlistitem(item_id, id)
-                    return output
-                else:
-                    result = {
-                        "message": "bucketlist not available"
-                    }
-                    return make_response(jsonify(result), 404)
-            else:
-                result = {
-                    "message": "unauthorized action"
-                }
-                return make_response(jsonify(result), 401)
+        output = Bucketlistitem.delete_bucketlistitem(item_id, id, g.user_id)
+        return output
+
+
+sync_arguments = reqparse.RequestParser()
+sync_arguments.add_argument(
+    'since',
+    location="args",
+    required=False,
+    help='sync_token of the previous sync, left out for a full sync')
+
+
+@ns.route('/sync')
+class Sync(Resource):
+    """
+    Incremental sync of the user's bucketlists and items
+    """
+    method_decorators = [login_required]
+
+    @api.header('Token', required=True)
+    @api.expect(sync_arguments)
+    def get(self):
+        """
+        Bucketlists and items changed since a sync token, with tombstones
+        for deleted ones
+        """
+        args = sync_arguments.parse_args()
+        try:
+            result = changes_since(g.user_id, args['since'])
+        except InvalidQuery as error:
+            return json_response(error.to_dict(), error.status_code)
+        return json_response(result, 200)
+
+
+@ns.route('/metrics')
+class Metrics(Resource):
+
+    def get(self):
+        """
+        Runtime statistics: database pool usage and token cache hit rates
+        """
+        return json_response(metrics.collect(), 200)
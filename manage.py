@@ -4,6 +4,7 @@ from flask_script import Manager
 from flask_migrate import MigrateCommand
 
 from bucketlist.app import app
+from bucketlist.models.models import Bucketlist, DeletedRecord
 
 manager = Manager(app)
 manager.add_command('db', MigrateCommand)
@@ -18,5 +19,18 @@ def test():
         return 0
     return 1
 
+
+@manager.command
+def prune_tombstones():
+    """drop sync tombstones older than the retention period"""
+    days = app.config.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30)
+    print('removed %d tombstones' % DeletedRecord.prune(days))
+
+
+@manager.command
+def repair_counts():
+    """recompute the item counters of bucketlists that drifted"""
+    print('repaired %d bucketlists' % Bucketlist.repair_counts())
+
 if __name__ == "__main__":
     manager.run()
@@ -0,0 +1,48 @@
+"""indexes for hot lookups
+
+Revision ID: 2ba29635464c
+Revises: 5ccdb9b9da87
+Create Date: 2026-10-18 19:44:32.539264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2ba29635464c'
+down_revision = '5ccdb9b9da87'
+branch_labels = None
+depends_on = None
+
+# Gives the unnamed unique constraint of users.password the name
+# PostgreSQL uses by default, so it can be dropped on SQLite as well.
+naming_convention = {
+    'uq': '%(table_name)s_%(column_0_name)s_key',
+}
+
+indexes = [
+    ('ix_bucketlists_created_by_id', 'bucketlists', ['created_by', 'id']),
+    ('ix_bucketlists_created_by_date_modified', 'bucketlists',
+     ['created_by', 'date_modified']),
+    ('ix_bucketlistitems_bucketlist_id_id', 'bucketlistitems',
+     ['bucketlist_id', 'id']),
+    ('ix_bucketlistitems_bucketlist_id_name', 'bucketlistitems',
+     ['bucketlist_id', 'name']),
+]
+
+
+def upgrade():
+    for name, table, columns in indexes:
+        op.create_index(name, table, columns)
+    with op.batch_alter_table(
+            'users', naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('users_password_key', type_='unique')
+
+
+def downgrade():
+    with op.batch_alter_table(
+            'users', naming_convention=naming_convention) as batch_op:
+        batch_op.create_unique_constraint('users_password_key', ['password'])
+    for name, table, columns in reversed(indexes):
+        op.drop_index(name, table)
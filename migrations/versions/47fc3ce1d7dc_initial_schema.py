@@ -0,0 +1,64 @@
+"""initial schema
+
+Revision ID: 47fc3ce1d7dc
+Revises:
+Create Date: 2026-10-18 19:42:10.402214
+
+The users, bucketlists and bucketlistitems tables as the first release
+created them. Databases created by that release's db.create_all()
+already have this schema; mark them with
+`python manage.py db stamp 47fc3ce1d7dc` before upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '47fc3ce1d7dc'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('password'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table(
+        'bucketlists',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('date_created', sa.DateTime(), nullable=True),
+        sa.Column('date_modified', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'],
+                                name='bucketlists_created_by_fkey'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'bucketlistitems',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=True),
+        sa.Column('done', sa.Boolean(), nullable=True),
+        sa.Column('bucketlist_id', sa.Integer(), nullable=True),
+        sa.Column('date_created', sa.DateTime(), nullable=True),
+        sa.Column('date_modified', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['bucketlist_id'], ['bucketlists.id'],
+                                name='bucketlistitems_bucketlist_id_fkey'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('bucketlistitems')
+    op.drop_table('bucketlists')
+    op.drop_table('users')
@@ -0,0 +1,52 @@
+"""cascade deletes in the database
+
+Revision ID: 5ccdb9b9da87
+Revises: 7ffc357f24d8
+Create Date: 2026-10-18 19:44:52.118932
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from bucketlist.search import get_backend
+
+
+# revision identifiers, used by Alembic.
+revision = '5ccdb9b9da87'
+down_revision = '7ffc357f24d8'
+branch_labels = None
+depends_on = None
+
+# Gives the unnamed foreign keys of SQLite databases created by
+# db.create_all() the names PostgreSQL uses by default.
+naming_convention = {
+    'fk': '%(table_name)s_%(column_0_name)s_fkey',
+}
+
+foreign_keys = [
+    ('bucketlists', 'created_by', 'users'),
+    ('bucketlistitems', 'bucketlist_id', 'bucketlists'),
+    ('refresh_tokens', 'user_id', 'users'),
+]
+
+
+def replace_foreign_keys(ondelete):
+    for table, column, referred in foreign_keys:
+        name = '%s_%s_fkey' % (table, column)
+        with op.batch_alter_table(
+                table, naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(
+                name, referred, [column], ['id'], ondelete=ondelete)
+    # Recreating bucketlists on SQLite drops the triggers of its search
+    # index, install them again.
+    bind = op.get_bind()
+    get_backend(bind.dialect.name).install(bind)
+
+
+def upgrade():
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys(None)
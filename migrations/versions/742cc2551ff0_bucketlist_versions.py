@@ -0,0 +1,34 @@
+"""bucketlist versions
+
+Revision ID: 742cc2551ff0
+Revises: e52fa14645bb
+Create Date: 2026-10-18 20:42:38.959468
+
+Adds the version counter that every write to a bucketlist or its items
+bumps, for freshness tokens that see writes within the same second.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from bucketlist.search import get_backend
+
+
+# revision identifiers, used by Alembic.
+revision = '742cc2551ff0'
+down_revision = 'e52fa14645bb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('bucketlists', sa.Column(
+        'version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('bucketlists') as batch_op:
+        batch_op.drop_column('version')
+    # Recreating bucketlists on SQLite drops the triggers of its search index
+    bind = op.get_bind()
+    get_backend(bind.dialect.name).install(bind)
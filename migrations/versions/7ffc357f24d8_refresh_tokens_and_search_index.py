@@ -0,0 +1,47 @@
+"""refresh tokens and search index
+
+Revision ID: 7ffc357f24d8
+Revises: 47fc3ce1d7dc
+Create Date: 2026-10-18 20:44:11.089590
+
+Adds the refresh_tokens table and installs the search backend. Databases
+created by db.create_all() after refresh tokens were introduced already
+have the table, it is only created when missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from bucketlist.search import get_backend
+
+
+# revision identifiers, used by Alembic.
+revision = '7ffc357f24d8'
+down_revision = '47fc3ce1d7dc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not bind.dialect.has_table(bind, 'refresh_tokens'):
+        op.create_table(
+            'refresh_tokens',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('jti', sa.String(length=32), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('revoked', sa.Boolean(), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.Column('date_created', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'],
+                                    name='refresh_tokens_user_id_fkey'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('jti')
+        )
+    get_backend(bind.dialect.name).install(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    get_backend(bind.dialect.name).uninstall(bind)
+    op.drop_table('refresh_tokens')
@@ -0,0 +1,83 @@
+"""scoped unique names
+
+Revision ID: 8f103a2811bb
+Revises: 2ba29635464c
+Create Date: 2026-10-18 19:48:29.910204
+
+Bucketlist names become unique per owner and item names unique per
+bucketlist. Renames could already produce duplicates, those rows get
+their id appended to the name, shortened to still fit the column,
+before the unique indexes are built.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f103a2811bb'
+down_revision = '2ba29635464c'
+branch_labels = None
+depends_on = None
+
+
+def unique_name(name, row_id, taken, length):
+    """
+    Appends the row id to name, cut short to fit length, and a counter
+    if that is taken as well
+    """
+    suffix = ' (%d)' % row_id
+    attempt = 1
+    while True:
+        candidate = name[:length - len(suffix)] + suffix
+        if candidate not in taken:
+            return candidate
+        attempt += 1
+        suffix = ' (%d-%d)' % (row_id, attempt)
+
+
+def deduplicate(table_name, scope, length):
+    """
+    Renames every row whose name an older row of the same scope already
+    has, reading only the scopes that hold duplicates
+    """
+    bind = op.get_bind()
+    table = sa.table(table_name, sa.column('id', sa.Integer),
+                     sa.column('name', sa.String), sa.column(scope, sa.Integer))
+    duplicated = sa.select([table.c[scope]]).where(
+        table.c.name.isnot(None)).group_by(
+        table.c[scope], table.c.name).having(sa.func.count() > 1)
+    rows = bind.execute(sa.select([
+        table.c.id, table.c.name, table.c[scope]]).where(
+        table.c[scope].in_(duplicated)).order_by(
+        table.c[scope], table.c.id)).fetchall()
+    names = {}
+    for row_id, name, scope_id in rows:
+        names.setdefault(scope_id, []).append((row_id, name))
+    for scoped in names.values():
+        taken = set(name for _, name in scoped)
+        seen = set()
+        for row_id, name in scoped:
+            if name is not None and name in seen:
+                name = unique_name(name, row_id, taken, length)
+                taken.add(name)
+                bind.execute(table.update().where(
+                    table.c.id == row_id).values(name=name))
+            seen.add(name)
+
+
+def upgrade():
+    deduplicate('bucketlists', 'created_by', 50)
+    deduplicate('bucketlistitems', 'bucketlist_id', 100)
+    op.create_index('ix_bucketlists_created_by_name', 'bucketlists',
+                    ['created_by', 'name'], unique=True)
+    op.drop_index('ix_bucketlistitems_bucketlist_id_name', 'bucketlistitems')
+    op.create_index('ix_bucketlistitems_bucketlist_id_name', 'bucketlistitems',
+                    ['bucketlist_id', 'name'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_bucketlistitems_bucketlist_id_name', 'bucketlistitems')
+    op.create_index('ix_bucketlistitems_bucketlist_id_name', 'bucketlistitems',
+                    ['bucketlist_id', 'name'])
+    op.drop_index('ix_bucketlists_created_by_name', 'bucketlists')
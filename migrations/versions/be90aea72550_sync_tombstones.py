@@ -0,0 +1,44 @@
+"""sync tombstones
+
+Revision ID: be90aea72550
+Revises: 8f103a2811bb
+Create Date: 2026-10-18 20:09:49.074358
+
+Tombstones of deleted bucketlists and items for GET /sync, and an index
+that lets the sync find changed items per bucketlist by date.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'be90aea72550'
+down_revision = '8f103a2811bb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'deleted_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('bucketlist_id', sa.Integer(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_deleted_records_user_id_deleted_at', 'deleted_records',
+                    ['user_id', 'deleted_at'])
+    op.create_index('ix_bucketlistitems_bucketlist_id_date_modified',
+                    'bucketlistitems', ['bucketlist_id', 'date_modified'])
+
+
+def downgrade():
+    op.drop_index('ix_bucketlistitems_bucketlist_id_date_modified',
+                  'bucketlistitems')
+    op.drop_index('ix_deleted_records_user_id_deleted_at', 'deleted_records')
+    op.drop_table('deleted_records')
@@ -0,0 +1,43 @@
+"""bucketlist item counters
+
+Revision ID: e52fa14645bb
+Revises: be90aea72550
+Create Date: 2026-10-18 20:16:47.784915
+
+Adds the item_count and done_count counters to bucketlists and fills
+them from the existing items.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e52fa14645bb'
+down_revision = 'be90aea72550'
+branch_labels = None
+depends_on = None
+
+
+backfill = """
+UPDATE bucketlists SET
+    item_count = (SELECT COUNT(*) FROM bucketlistitems
+                  WHERE bucketlistitems.bucketlist_id = bucketlists.id),
+    done_count = (SELECT COUNT(*) FROM bucketlistitems
+                  WHERE bucketlistitems.bucketlist_id = bucketlists.id
+                  AND bucketlistitems.done)
+"""
+
+
+def upgrade():
+    op.add_column('bucketlists', sa.Column(
+        'item_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('bucketlists', sa.Column(
+        'done_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(backfill)
+
+
+def downgrade():
+    with op.batch_alter_table('bucketlists') as batch_op:
+        batch_op.drop_column('done_count')
+        batch_op.drop_column('item_count')